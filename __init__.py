@@ -1,30 +1,25 @@
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers import aiohttp_client
 
-from .api import ProAirAPI
-from .coordinator import ProAirDataUpdateCoordinator
-from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD, CONF_DEVICE_ID
+from .account import async_acquire_account, async_release_account
+from .session import async_close_session
+from .store import ProAirSessionStore, ProAirHistoryStore, ProAirTopologyStore, ProAirScheduleStore
+from .const import (
+    DOMAIN,
+    CONF_USERNAME,
+    CONF_DEVICE_ID,
+    SERVICE_SET_ZONES,
+    SERVICE_GET_HISTORY,
+    SERVICE_SET_SCHEDULE,
+)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the integration from a Config Entry."""
     
-    session = aiohttp_client.async_get_clientsession(hass)
-    
-    api = ProAirAPI(
-        session,
-        entry.data[CONF_USERNAME], 
-        entry.data[CONF_PASSWORD], 
-        entry.data[CONF_DEVICE_ID]
-    )
-    
-    # Perform login to retrieve serial number and validate credentials
-    await api.login()
-    
-    coordinator = ProAirDataUpdateCoordinator(hass, api)
-    
-    # First data refresh
-    await coordinator.async_config_entry_first_refresh()
+    # Entries of the same account share one poller: login, first refresh and
+    # the zone history are only handled by the first of them. With a saved
+    # zone layout, the first refresh runs in the background.
+    coordinator = await async_acquire_account(hass, entry)
     
     # Save the coordinator
     hass.data.setdefault(DOMAIN, {})
@@ -32,12 +27,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     # Start climate and sensor platforms
     await hass.config_entries.async_forward_entry_setups(entry, ["climate", "sensor"])
+
+    # Reload when options change
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the integration after an options update."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Remove the integration and clean up."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["climate", "sensor"])
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        # Stops the poller, flushing pending commands, unless another entry still uses it
+        await async_release_account(hass, entry)
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, SERVICE_SET_ZONES)
+            hass.services.async_remove(DOMAIN, SERVICE_GET_HISTORY)
+            hass.services.async_remove(DOMAIN, SERVICE_SET_SCHEDULE)
+            await async_close_session(hass)
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the saved session, history, zone layout and schedules of a removed entry, unless another entry uses the account."""
+    username, device_id = entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID]
+    for other in hass.config_entries.async_entries(DOMAIN):
+        if other.entry_id != entry.entry_id and (other.data[CONF_USERNAME], other.data[CONF_DEVICE_ID]) == (username, device_id):
+            return
+    await ProAirSessionStore(hass, username, device_id).async_remove()
+    await ProAirHistoryStore(hass, username, device_id).async_remove()
+    await ProAirTopologyStore(hass, username, device_id).async_remove()
+    await ProAirScheduleStore(hass, username, device_id).async_remove()
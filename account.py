@@ -0,0 +1,181 @@
+import asyncio
+import logging
+
+from homeassistant import config_entries
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+
+from .api import ProAirAPI
+from .coordinator import ProAirDataUpdateCoordinator
+from .session import async_get_session
+from .store import ProAirSessionStore, ProAirHistoryStore, ProAirTopologyStore, ProAirScheduleStore, account_id
+from .const import (
+    DOMAIN,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_DEVICE_ID,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_BUDGET,
+    CONF_STALE_WINDOW,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_BUDGET,
+    DEFAULT_STALE_WINDOW,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_ACCOUNTS = f"{DOMAIN}_accounts"
+
+class ProAirAccount:
+    """Poller of one cloud account, shared by every config entry using it.
+
+    Each control unit of the account is fetched once per interval, with a single token
+    sequence, and the snapshot is fanned out to the entities of all subscribed entries.
+    """
+
+    def __init__(
+        self,
+        coordinator: ProAirDataUpdateCoordinator,
+        history_store: ProAirHistoryStore,
+        first_refresh: asyncio.Task[None] | None = None,
+    ) -> None:
+        self.coordinator = coordinator
+        self.history_store = history_store
+        # First refresh running in the background, if setup didn't wait for it
+        self.first_refresh = first_refresh
+        self.entries: set[str] = set()
+
+    @callback
+    def async_start_reauth(self) -> None:
+        """Ask every subscribed entry for new credentials."""
+        hass = self.coordinator.hass
+        for entry_id in self.entries:
+            if (entry := hass.config_entries.async_get_entry(entry_id)) is not None:
+                entry.async_start_reauth(hass)
+
+class ProAirAccounts:
+    """Accounts in use, keyed by account_id(username, device_id)."""
+
+    def __init__(self) -> None:
+        self.accounts: dict[str, ProAirAccount] = {}
+        # Entries of the same account are set up concurrently: only one creates the poller
+        self.lock = asyncio.Lock()
+
+def _accounts(hass: HomeAssistant) -> ProAirAccounts:
+    if DATA_ACCOUNTS not in hass.data:
+        hass.data[DATA_ACCOUNTS] = ProAirAccounts()
+    return hass.data[DATA_ACCOUNTS]
+
+async def async_acquire_account(hass: HomeAssistant, entry: ConfigEntry) -> ProAirDataUpdateCoordinator:
+    """Subscribe `entry` to the poller of its account, starting it if needed."""
+    accounts = _accounts(hass)
+    key = account_id(entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    async with accounts.lock:
+        account = accounts.accounts.get(key)
+        if account is None:
+            account = await _async_start_account(hass, entry)
+            account.coordinator.on_auth_failed = account.async_start_reauth
+            accounts.accounts[key] = account
+        else:
+            if account.entries:
+                _LOGGER.debug("Sharing the poller of %s with entry %s", entry.title, entry.entry_id)
+            # The entry may be reloaded after a reauth or an options change while
+            # another entry keeps the poller running: the last one set up wins
+            account.coordinator.api.password = entry.data[CONF_PASSWORD]
+            account.coordinator.apply_options(*_options(entry))
+        account.entries.add(entry.entry_id)
+        return account.coordinator
+
+def _options(entry: ConfigEntry) -> tuple[int, int, float]:
+    """Polling options of an entry: max concurrency, request budget and stale window."""
+    return (
+        entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+        entry.options.get(CONF_REQUEST_BUDGET, DEFAULT_REQUEST_BUDGET),
+        entry.options.get(CONF_STALE_WINDOW, DEFAULT_STALE_WINDOW),
+    )
+
+async def _async_start_account(hass: HomeAssistant, entry: ConfigEntry) -> ProAirAccount:
+    """Log in, resume the saved history and fetch the first snapshot.
+
+    With a saved session and zone layout nothing waits for the cloud: entities are
+    created from the layout and filled in by a first refresh running in the background.
+    """
+    api = ProAirAPI(
+        async_get_session(hass),
+        entry.data[CONF_USERNAME],
+        entry.data[CONF_PASSWORD],
+        entry.data[CONF_DEVICE_ID],
+    )
+
+    # Resume the saved session if any, otherwise perform login to retrieve the
+    # serial numbers of every plant and validate credentials
+    store = ProAirSessionStore(hass, entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    restored = await store.async_restore(api)
+    if not restored:
+        await api.login()
+    store.attach(api)
+
+    # The poller outlives the entry that started it, so it must not be tied to it:
+    # it is shut down when its last entry is released, and failed logins start a
+    # reauth flow for every entry using it (see ProAirAccount.async_start_reauth).
+    # Unbound, it can't use async_config_entry_first_refresh, see below.
+    token = config_entries.current_entry.set(None)
+    try:
+        coordinator = ProAirDataUpdateCoordinator(hass, api, *_options(entry))
+    finally:
+        config_entries.current_entry.reset(token)
+    await coordinator.async_register_shutdown()
+
+    # Resume the zone history saved before the last restart
+    history_store = ProAirHistoryStore(hass, entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    await history_store.async_restore(coordinator.history)
+    history_store.attach(coordinator.history)
+
+    topology_store = ProAirTopologyStore(hass, entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    coordinator.topology = await topology_store.async_load()
+    topology_store.attach(coordinator)
+
+    schedule_store = ProAirScheduleStore(hass, entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    await schedule_store.async_restore(coordinator.schedule)
+    schedule_store.attach(coordinator.schedule)
+
+    # First data refresh, blocking only when the zone layout is unknown
+    first_refresh = None
+    if restored and coordinator.topology:
+        first_refresh = hass.async_create_background_task(coordinator.async_refresh(), f"{DOMAIN} first refresh")
+    else:
+        try:
+            await coordinator.async_refresh()
+        except BaseException:
+            # Setup failed: don't leave the shutdown listener and timers behind
+            await coordinator.async_shutdown()
+            raise
+        if not coordinator.last_update_success:
+            await coordinator.async_shutdown()
+            if isinstance(coordinator.last_exception, ConfigEntryAuthFailed):
+                raise ConfigEntryAuthFailed from coordinator.last_exception
+            raise ConfigEntryNotReady from coordinator.last_exception
+    coordinator.schedule.async_start()
+    return ProAirAccount(coordinator, history_store, first_refresh)
+
+async def async_release_account(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Unsubscribe `entry`, stopping the poller with its last entry."""
+    accounts = _accounts(hass)
+    key = account_id(entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID])
+    async with accounts.lock:
+        account = accounts.accounts.get(key)
+        if account is None:
+            return
+        account.entries.discard(entry.entry_id)
+        if account.entries:
+            return
+        del accounts.accounts[key]
+
+    coordinator = account.coordinator
+    if account.first_refresh is not None:
+        account.first_refresh.cancel()
+    # Don't drop commands still waiting in the coalescing window
+    await coordinator.commands.async_flush()
+    await coordinator.async_shutdown()
+    await account.history_store.async_save()
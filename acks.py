@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .const import COMMAND_ACK_DELAY, COMMAND_ACK_MAX_DELAY, COMMAND_ACK_TIMEOUT
+from .models import ZoneState
+
+_LOGGER = logging.getLogger(__name__)
+
+# Status of a tracked command
+ACK_PENDING = "pending"
+ACK_CONFIRMED = "confirmed"
+ACK_REJECTED = "rejected"
+ACK_TIMEOUT = "timeout"
+
+class CommandAck:
+    """A zone command accepted by the cloud, waiting for the unit to report it applied."""
+
+    __slots__ = ("serial", "zone_id", "expected", "status", "sent", "checks")
+
+    def __init__(self, serial: str, zone_id: int, expected: dict[str, Any], accepted: bool, sent: float) -> None:
+        self.serial = serial
+        self.zone_id = zone_id
+        # ZoneState values the command should produce, e.g. target_temperature and is_off
+        self.expected = expected
+        self.status = ACK_PENDING if accepted else ACK_REJECTED
+        # Loop time at which the cloud accepted the command
+        self.sent = sent
+        # Targeted checks done since, driving the backoff
+        self.checks = 0
+
+    @property
+    def pending(self) -> bool:
+        return self.status == ACK_PENDING
+
+    def applied(self, zone: ZoneState) -> bool:
+        """Return whether a zone reported by the unit carries the requested values.
+
+        Parsed values are compared, so a unit reporting SetTemp as "215" confirms 21.5.
+        """
+        return all(getattr(zone, key) == value for key, value in self.expected.items())
+
+class ProAirCommandTracker:
+    """Follow sent zone commands until their control unit confirms them.
+
+    Instead of polling every unit, `check(serial)` fetches only the unit with pending
+    commands, after `initial_delay` and then with exponential backoff up to `max_delay`.
+    `check` feeds what it fetched to `observe`, and so can any regular poll: it returns
+    the commands it confirmed. Commands the unit doesn't report within `timeout` seconds
+    are given up and handed to `on_timeout`.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[str], Awaitable[None]],
+        on_timeout: Callable[[CommandAck], None],
+        initial_delay: float = COMMAND_ACK_DELAY,
+        max_delay: float = COMMAND_ACK_MAX_DELAY,
+        timeout: float = COMMAND_ACK_TIMEOUT,
+    ) -> None:
+        self._check = check
+        self._on_timeout = on_timeout
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._timeout = timeout
+        # Latest command of every zone, kept once resolved so entities can show its outcome
+        self._acks: dict[tuple[str, int], CommandAck] = {}
+        self._timers: dict[str, tuple[float, asyncio.TimerHandle]] = {}
+        self._checking: set[str] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def get(self, serial: str, zone_id: int) -> CommandAck | None:
+        """Return the latest command sent to a zone."""
+        return self._acks.get((serial, zone_id))
+
+    def is_pending(self, serial: str, zone_id: int) -> bool:
+        ack = self._acks.get((serial, zone_id))
+        return ack is not None and ack.pending
+
+    def track(self, serial: str, zone_id: int, expected: dict[str, Any], accepted: bool) -> CommandAck:
+        """Start following a command; a newer command of the same zone replaces the older one."""
+        ack = CommandAck(serial, zone_id, expected, accepted, asyncio.get_running_loop().time())
+        self._acks[(serial, zone_id)] = ack
+        if ack.pending:
+            _LOGGER.debug("Tracking command for zone %s of %s", zone_id, serial)
+            if serial not in self._checking:
+                self._schedule(serial, self._initial_delay)
+        return ack
+
+    def observe(self, zones: dict[tuple[str, int], ZoneState], fetched: float) -> list[CommandAck]:
+        """Confirm the pending commands that zones fetched at loop time `fetched` show applied."""
+        confirmed = []
+        for key, ack in self._acks.items():
+            # A poll started before the command was sent can't confirm it
+            if not ack.pending or ack.sent > fetched or (zone := zones.get(key)) is None:
+                continue
+            if ack.applied(zone):
+                _LOGGER.debug("Command for zone %s confirmed by %s", ack.zone_id, ack.serial)
+                ack.status = ACK_CONFIRMED
+                confirmed.append(ack)
+        return confirmed
+
+    def _schedule(self, serial: str, delay: float) -> None:
+        """Check `serial` after `delay` seconds, unless a check is already due earlier."""
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        if (timer := self._timers.get(serial)) is not None:
+            if timer[0] <= due:
+                return
+            timer[1].cancel()
+        self._timers[serial] = (due, loop.call_later(delay, self._start_check, serial))
+
+    def _start_check(self, serial: str) -> None:
+        self._timers.pop(serial, None)
+        self._checking.add(serial)
+        task = asyncio.get_running_loop().create_task(self._async_check(serial))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_check(self, serial: str) -> None:
+        """Fetch a unit, give up expired commands and plan the next check."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self._check(serial)
+        except Exception as err:  # pylint: disable=broad-except
+            # A failed check counts as one: the next one backs off
+            _LOGGER.debug("Command check of %s failed: %s", serial, err)
+        finally:
+            self._checking.discard(serial)
+
+        now = loop.time()
+        pending = [ack for ack in self._acks.values() if ack.serial == serial and ack.pending]
+        for ack in pending:
+            if ack.sent <= started:
+                ack.checks += 1
+        expired = [ack for ack in pending if now - ack.sent >= self._timeout]
+        for ack in expired:
+            _LOGGER.warning(
+                "Zone %s of %s didn't report its new values within %s s", ack.zone_id, serial, self._timeout
+            )
+            ack.status = ACK_TIMEOUT
+            self._on_timeout(ack)
+        pending = [ack for ack in pending if ack.pending]
+        if pending:
+            # The newest command sets the pace, and the oldest one is checked once more when it expires
+            delay = min(min(self._initial_delay * 2 ** ack.checks, self._max_delay) for ack in pending)
+            deadline = min(ack.sent for ack in pending) + self._timeout
+            self._schedule(serial, max(0.0, min(delay, deadline - now)))
+
+    def cancel(self) -> None:
+        """Stop every scheduled check."""
+        for _, timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
@@ -4,10 +4,45 @@ import base64
 import json
 import logging
 import asyncio
-from typing import Any
+import ssl
+import time
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
-from .const import SALT, API_BASE_URL, API_LOGIN_URL, DEFAULT_PIN
+
+try:
+    # Optional fast decoder, bundled with Home Assistant
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
+from .const import (
+    SALT,
+    API_BASE_URL,
+    API_LOGIN_URL,
+    DEFAULT_PIN,
+    DEFAULT_MAX_CONCURRENCY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_BASE_DELAY,
+    CIRCUIT_MAX_DELAY,
+    SERIALS_REFRESH_INTERVAL,
+    CONNECTION_LIMIT,
+    KEEPALIVE_TIMEOUT,
+    DNS_CACHE_TTL,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+)
+from .metrics import (
+    ProAirMetrics,
+    OUTCOME_OK,
+    OUTCOME_UNAUTHORIZED,
+    OUTCOME_HTTP_ERROR,
+    OUTCOME_SERVER_ERROR,
+    OUTCOME_TIMEOUT,
+    OUTCOME_CONNECTION_ERROR,
+    OUTCOME_INVALID_RESPONSE,
+    OUTCOME_CANCELLED,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,6 +55,66 @@ class ProAirAuthError(ProAirError):
 class ProAirConnectionError(ProAirError):
     """Connection error."""
 
+class ProAirServerError(ProAirConnectionError):
+    """The cloud answered 429 or 5xx."""
+
+    def __init__(self, status: int, retry_after: float | None = None) -> None:
+        super().__init__(f"Server error {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class ProAirResponseError(ProAirConnectionError):
+    """The cloud answered with an error status or without the expected payload."""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+class ProAirCircuitOpenError(ProAirConnectionError):
+    """Requests are suspended after repeated failures."""
+
+class ZoneUpdate(NamedTuple):
+    """Requested state of a zone for set_zones."""
+
+    zone_id: int
+    zone_name: str
+    temp: float
+    is_off: bool = False
+    serial: str | None = None
+
+def _endpoint(url: str) -> str:
+    """Name of the endpoint of a request URL, e.g. GetCUState."""
+    return url.partition("?")[0].rpartition("/")[2]
+
+def _status_outcome(status: int) -> str:
+    if status == 200:
+        return OUTCOME_OK
+    if status == 401:
+        return OUTCOME_UNAUTHORIZED
+    if status == 429 or status >= 500:
+        return OUTCOME_SERVER_ERROR
+    return OUTCOME_HTTP_ERROR
+
+def create_session(ssl_context: ssl.SSLContext | bool = True, limit: int = CONNECTION_LIMIT) -> aiohttp.ClientSession:
+    """Create a session tuned for the ProAir cloud.
+
+    Connections are kept alive across polls, DNS answers are cached and every request
+    gets its own connect and read timeouts. All TLS connections share `ssl_context`.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        enable_cleanup_closed=True,
+        ssl=ssl_context,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+    )
+
 class ProAirCrypto:
     def __init__(self, device_id: str):
         key_input = device_id[:8] + SALT
@@ -45,26 +140,122 @@ class ProAirCrypto:
              raise ProAirError("Encryption failed") from e
 
 class ProAirAPI:
-    def __init__(self, session: aiohttp.ClientSession, email: str, password: str, device_id: str) -> None:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        email: str,
+        password: str,
+        device_id: str,
+        base_url: str = API_BASE_URL,
+        login_url: str = API_LOGIN_URL,
+    ) -> None:
         self.session = session
         self.email = email
         self.password = password
         self.device_id = device_id
+        self.base_url = base_url
+        self.login_url = login_url
         self.crypto = ProAirCrypto(device_id)
+        self._user_auth = base64.b64encode(f"{email}:PwdProAir".encode()).decode()
         self.token: str | None = None
+        # Plaintext of the current token ("<base>_<counter>"), kept so that
+        # incrementing it only costs one encryption
+        self._token_base: str | None = None
+        self._token_count = 0
         self.serial: str | None = None
-        self._lock = asyncio.Lock()
+        self.serials: list[str] = []
+        # Wall-clock time of the login that discovered the serials, saved with the session
+        self.discovered_at: float | None = None
+        # Guards the token only: increments, adoption of server tokens and logins.
+        # The HTTP exchange itself runs outside of it so several requests can be in flight.
+        self._token_lock = asyncio.Lock()
+        # Bumped on every login, so responses to requests signed with an older token
+        # can't overwrite the freshly issued one
+        self._token_generation = 0
+        # Requests sent to the cloud, logins excluded; used for the request budget
+        self.request_count = 0
+        # Called whenever token or serials change, so the session can be persisted
+        self.on_session_change: Callable[[], None] | None = None
+        # Login shared by every concurrent caller while it is in progress
+        self._login_task: asyncio.Task[bool] | None = None
+        # Circuit breaker: consecutive failures and monotonic time until which requests are refused
+        self._failures = 0
+        self._circuit_open_until = 0.0
+        # Request counters and latency histograms, exposed as diagnostics
+        self.metrics = ProAirMetrics()
+
+    def export_session(self) -> dict[str, Any]:
+        """Return what is needed to resume this session without logging in."""
+        return {"token": self.token, "serials": list(self.serials), "discovered_at": self.discovered_at}
+
+    def restore_session(self, data: dict[str, Any]) -> bool:
+        """Resume a session saved by export_session; the next 401 triggers a real login.
+
+        Sessions whose serials are due for discovery again aren't resumed.
+        """
+        token = data.get("token")
+        serials = data.get("serials")
+        discovered_at = data.get("discovered_at")
+        if not token or not serials or self._serials_expired(discovered_at):
+            return False
+        self._set_token(token)
+        if self._token_base is None:
+            self.token = None
+            return False
+        self.serials = list(serials)
+        self.serial = self.serials[0]
+        self.discovered_at = discovered_at
+        return True
+
+    @staticmethod
+    def _serials_expired(discovered_at: float | None) -> bool:
+        return discovered_at is None or time.time() - discovered_at >= SERIALS_REFRESH_INTERVAL
+
+    @property
+    def serials_expired(self) -> bool:
+        """Whether a login should look again for the control units of the account."""
+        return self._serials_expired(self.discovered_at)
+
+    def _session_changed(self) -> None:
+        if self.on_session_change is not None:
+            self.on_session_change()
+
+    def _set_token(self, token: str) -> None:
+        """Adopt a server-issued token, decrypting it once to cache base and counter."""
+        if token == self.token:
+            return
+        try:
+            start = time.perf_counter()
+            plain = self.crypto.decrypt(token)
+            self.metrics.crypto.observe(time.perf_counter() - start)
+            base, _, count = plain.rpartition('_')
+            count_value = int(count)
+        except Exception as e:
+            _LOGGER.error("Token parse error: %s", e)
+            self.token = token
+            self._token_base = None
+            return
+
+        if base == self._token_base and count_value < self._token_count:
+            # An older answer of a concurrent request: never move the counter backwards
+            return
+        self.token = token
+        self._token_base = base
+        self._token_count = count_value
+        self._session_changed()
 
     def _update_token_local(self) -> str:
         """Increment current token locally."""
         if not self.token:
             return ""
+        if self._token_base is None:
+            return self.token
         try:
-            plain = self.crypto.decrypt(self.token)
-            parts = plain.split('_')
-            base = "_".join(parts[:-1])
-            count = int(parts[-1])
-            self.token = self.crypto.encrypt(f"{base}_{count + 1}")
+            self._token_count += 1
+            start = time.perf_counter()
+            self.token = self.crypto.encrypt(f"{self._token_base}_{self._token_count}")
+            self.metrics.crypto.observe(time.perf_counter() - start)
+            self._session_changed()
             return self.token
         except Exception as e:
             _LOGGER.error("Token increment error: %s", e)
@@ -72,16 +263,84 @@ class ProAirAPI:
 
     def _get_auth_headers(self, token: str) -> dict[str, str]:
         """Generate auth headers."""
-        user_auth = base64.b64encode(f"{self.email}:PwdProAir".encode()).decode()
         return {
             "Token": token,
-            "Authorization": f"Basic {user_auth}",
+            "Authorization": f"Basic {self._user_auth}",
             "UserObj-Agent": "benincapp",
             "User-Agent": "Tecnosystemi/2.2.3"
         }
 
     async def login(self) -> bool:
         """Perform login and get initial token."""
+        self._check_circuit()
+        try:
+            result = await self._shared_login()
+        except (ProAirAuthError, ProAirConnectionError):
+            self._record_failure()
+            raise
+        self._record_success()
+        return result
+
+    async def _shared_login(self) -> bool:
+        """Join the login in progress, or start one: concurrent callers share a single round trip."""
+        if self._login_task is None:
+            self._login_task = asyncio.get_running_loop().create_task(self._locked_login())
+            self._login_task.add_done_callback(self._login_done)
+        # Shielded, so a cancelled caller doesn't cancel the login of the others
+        return await asyncio.shield(self._login_task)
+
+    def _login_done(self, task: asyncio.Task[bool]) -> None:
+        self._login_task = None
+        if not task.cancelled():
+            # Retrieved by the waiters; avoid "exception never retrieved" if all were cancelled
+            task.exception()
+
+    async def _locked_login(self) -> bool:
+        async with self._token_lock:
+            return await self._login()
+
+    async def _relogin(self, generation: int) -> None:
+        """Log in again unless another request already did since `generation` was read."""
+        if generation == self._token_generation or not self.token:
+            await self._shared_login()
+
+    def _check_circuit(self) -> None:
+        """Refuse to contact the cloud while the circuit breaker is open."""
+        remaining = self._circuit_open_until - time.monotonic()
+        if remaining > 0:
+            self.metrics.increment("circuit_rejections")
+            raise ProAirCircuitOpenError(
+                f"Requests suspended for {remaining:.0f} s after {self._failures} consecutive failures"
+            )
+
+    @property
+    def consecutive_failures(self) -> int:
+        return self._failures
+
+    @property
+    def circuit_open(self) -> bool:
+        """Return whether requests are currently suspended by the circuit breaker."""
+        return self._circuit_open_until > time.monotonic()
+
+    def _record_success(self) -> None:
+        self._failures = 0
+        self._circuit_open_until = 0.0
+
+    def _record_failure(self) -> None:
+        """Count a failed exchange, opening the circuit with exponential backoff."""
+        self._failures += 1
+        if self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+            delay = min(CIRCUIT_MAX_DELAY, CIRCUIT_BASE_DELAY * 2 ** (self._failures - CIRCUIT_FAILURE_THRESHOLD))
+            self._circuit_open_until = time.monotonic() + delay
+            _LOGGER.warning("%s consecutive ProAir failures, suspending requests for %s s", self._failures, delay)
+
+    async def _next_token(self) -> tuple[int, str]:
+        """Return the current token generation and the next token of the sequence."""
+        async with self._token_lock:
+            return self._token_generation, self._update_token_local()
+
+    async def _login(self) -> bool:
+        """Login round trip, the caller must hold the token lock."""
         auth_init = base64.b64encode(b"UsrProAir:PwdProAir").decode()
         headers = {
             "Authorization": f"Basic {auth_init}", 
@@ -95,87 +354,193 @@ class ProAirAPI:
             "Platform": "apns"
         }
         
+        self.metrics.increment("logins")
+        start = time.perf_counter()
+        outcome = OUTCOME_CONNECTION_ERROR
         try:
-            async with self.session.post(API_LOGIN_URL, json=payload, headers=headers) as resp:
+            async with self.session.post(self.login_url, json=payload, headers=headers) as resp:
+                outcome = _status_outcome(resp.status)
                 if resp.status != 200:
                     raise ProAirAuthError(f"Login failed: {resp.status}")
                 
-                data = await resp.json()
+                try:
+                    data = await resp.json()
+                except (aiohttp.ContentTypeError, ValueError):
+                    outcome = OUTCOME_INVALID_RESPONSE
+                    raise
                 if "Token" in data:
-                    self.token = data["Token"]
-                    # Usually "ListPlants" -> "ListDevices" -> "Serial"
-                    if data.get("ListPlants") and data["ListPlants"][0].get("ListDevices"):
-                        self.serial = data["ListPlants"][0]["ListDevices"][0]["Serial"]
+                    self.token = None
+                    self._token_base = None
+                    self._set_token(data["Token"])
+                    self._token_generation += 1
+                    # Usually "ListPlants" -> "ListDevices" -> "Serial", one entry per control unit
+                    serials = [
+                        device["Serial"]
+                        for plant in data.get("ListPlants") or []
+                        for device in plant.get("ListDevices") or []
+                        if device.get("Serial")
+                    ]
+                    if serials:
+                        self.serials = list(dict.fromkeys(serials))
+                        self.serial = self.serials[0]
+                        self.discovered_at = time.time()
+                        self._session_changed()
                         return True
                 raise ProAirAuthError("Token or Serial not found in login response")
         except aiohttp.ClientError as e:
+            if isinstance(e, aiohttp.ServerTimeoutError):
+                outcome = OUTCOME_TIMEOUT
             raise ProAirConnectionError(f"Connection error during login: {e}") from e
+        except asyncio.TimeoutError:
+            outcome = OUTCOME_TIMEOUT
+            raise
+        except asyncio.CancelledError:
+            outcome = OUTCOME_CANCELLED
+            raise
+        finally:
+            self.metrics.record_request("Login", outcome, time.perf_counter() - start)
 
-    async def _make_request(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
-        """Centralized request logic with token refresh and error handling."""
-        async with self._lock:
-            if not self.token:
-                await self.login()
-
-            # Extract headers once to avoid popping in loop
-            active_kwargs = kwargs.copy()
-            passed_headers = active_kwargs.pop("headers", None)
-
-            # Retry loop for connection errors
-            for attempt in range(3):
-                current_token = self._update_token_local()
-                headers = self._get_auth_headers(current_token)
-                
-                if passed_headers:
-                    headers.update(passed_headers)
-                
+    async def _send(
+        self, method: str, url: str, token: str, passed_headers: dict[str, str] | None, kwargs: dict[str, Any]
+    ) -> tuple[int, dict[str, Any]]:
+        """Perform a single HTTP exchange signed with `token`."""
+        headers = self._get_auth_headers(token)
+        if passed_headers:
+            headers.update(passed_headers)
+
+        self.request_count += 1
+        start = time.perf_counter()
+        outcome = OUTCOME_CONNECTION_ERROR
+        try:
+            async with self.session.request(method, url, headers=headers, **kwargs) as resp:
+                outcome = _status_outcome(resp.status)
+                if outcome == OUTCOME_SERVER_ERROR:
+                    retry_after = resp.headers.get("Retry-After", "")
+                    raise ProAirServerError(resp.status, float(retry_after) if retry_after.isdigit() else None)
+                if resp.status == 401:
+                    # The status alone triggers the re-login, whatever the body holds
+                    return resp.status, {}
+                # Decode the raw bytes directly: no intermediate str, and orjson when available
+                body = await resp.read()
                 try:
-                    async with self.session.request(method, url, headers=headers, **active_kwargs) as resp:
-                        if resp.status == 401:
-                            _LOGGER.debug("401 Unauthorized, performing re-login")
-                            await self.login()
-                            current_token = self._update_token_local()
-                            headers = self._get_auth_headers(current_token)
-                            if passed_headers:
-                                headers.update(passed_headers)
-                                
-                            # Retry immediately with new token
-                            async with self.session.request(method, url, headers=headers, **active_kwargs) as resp2:
-                                resp = resp2
-                        
-                        data: dict[str, Any] = await resp.json()
-                        
-                        if data and data.get("Token"):
-                            self.token = data["Token"]
-                        
-                        if resp.status != 200:
-                             _LOGGER.error("API error %s: %s", resp.status, data)
-                             # We could raise an exception here depending on API behavior, 
-                             # but keeping it consistent with legacy behavior of returning data + False return in logic
-                        
-                        _LOGGER.debug("API Response for %s: %s", url, data)
-                        return data
-
-                except aiohttp.ClientError as e:
-                    if attempt < 2:
-                         _LOGGER.debug("Connection error (attempt %d/3): %s. Retrying...", attempt + 1, e)
-                         await asyncio.sleep(1)
-                    else:
-                         raise ProAirConnectionError(f"Communication error: {e}") from e
-            
-            raise ProAirConnectionError("Unknown error after retries")
-
-    async def get_state(self) -> dict[str, Any]:
-        """Fetch system state."""
+                    data: dict[str, Any] = json_loads(body) if body.strip() else {}
+                except ValueError as err:
+                    if 200 <= resp.status < 300:
+                        outcome = OUTCOME_INVALID_RESPONSE
+                        raise aiohttp.ClientPayloadError(f"Invalid JSON response: {err}") from err
+                    # An error page instead of JSON: the status says enough
+                    data = {}
+                return resp.status, data
+        except (asyncio.TimeoutError, aiohttp.ServerTimeoutError):
+            outcome = OUTCOME_TIMEOUT
+            raise
+        except asyncio.CancelledError:
+            outcome = OUTCOME_CANCELLED
+            raise
+        finally:
+            self.metrics.record_request(_endpoint(url), outcome, time.perf_counter() - start)
+
+    async def _make_request(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        """Centralized request logic with token refresh, error handling and circuit breaker."""
+        self._check_circuit()
+        try:
+            data = await self._request_with_retries(method, url, **kwargs)
+        except ProAirCircuitOpenError:
+            raise
+        except (ProAirAuthError, ProAirConnectionError):
+            self._record_failure()
+            raise
+        self._record_success()
+        return data
+
+    async def _request_with_retries(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        """Perform a request, re-logging on 401 and retrying connection errors.
+
+        Only the token handling is serialized, so a slow poll doesn't hold back commands.
+        """
+        if not self.token:
+            await self._relogin(self._token_generation)
+
+        # Extract headers once to avoid popping in loop
+        active_kwargs = kwargs.copy()
+        passed_headers = active_kwargs.pop("headers", None)
+
+        # Retry loop for connection errors
+        for attempt in range(3):
+            try:
+                generation, current_token = await self._next_token()
+                status, data = await self._send(method, url, current_token, passed_headers, active_kwargs)
+
+                if status == 401:
+                    _LOGGER.debug("401 Unauthorized, performing re-login")
+                    self.metrics.increment("relogins")
+                    await self._relogin(generation)
+
+                    # Retry immediately with new token
+                    generation, current_token = await self._next_token()
+                    status, data = await self._send(method, url, current_token, passed_headers, active_kwargs)
+
+                if data and data.get("Token"):
+                    async with self._token_lock:
+                        if generation == self._token_generation:
+                            self._set_token(data["Token"])
+
+                if status != 200:
+                    # An error body is not a state or a command result: callers fall back
+                    # to what they know instead of storing it
+                    _LOGGER.error("API error %s: %s", status, data)
+                    raise ProAirResponseError(f"API error {status}", status)
+
+                _LOGGER.debug("API Response for %s: %s", url, data)
+                return data
+
+            except ProAirServerError as e:
+                # Don't insist when the cloud asks to slow down
+                if e.status == 429 or attempt == 2:
+                    raise
+                _LOGGER.debug("Server error (attempt %d/3): %s. Retrying...", attempt + 1, e)
+                self.metrics.increment("retries")
+                await asyncio.sleep(1)
+
+            except aiohttp.ClientError as e:
+                if attempt < 2:
+                     _LOGGER.debug("Connection error (attempt %d/3): %s. Retrying...", attempt + 1, e)
+                     self.metrics.increment("retries")
+                     await asyncio.sleep(1)
+                else:
+                     raise ProAirConnectionError(f"Communication error: {e}") from e
+
+        raise ProAirConnectionError("Unknown error after retries")
+
+    async def get_state(self, serial: str | None = None) -> dict[str, Any]:
+        """Fetch system state of a control unit (the first discovered one by default)."""
         if not self.serial:
             await self.login()
-        url = f"{API_BASE_URL}/GetCUState?cuSerial={self.serial}&PIN={DEFAULT_PIN}"
-        return await self._make_request("GET", url)
+        serial = serial or self.serial
+        url = f"{self.base_url}/GetCUState?cuSerial={serial}&PIN={DEFAULT_PIN}"
+        data = await self._make_request("GET", url)
+        if not isinstance(data.get("Zones"), list):
+            raise ProAirResponseError(f"No zones in the state of control unit {serial}")
+        return data
 
-    async def set_temperature(self, zone_id: int, zone_name: str, temp: float, is_off: bool = False) -> bool:
+    async def set_temperature(
+        self, zone_id: int, zone_name: str, temp: float, is_off: bool = False, serial: str | None = None
+    ) -> bool:
         """Set temperature for a zone."""
+        return await self.send_zone_command(zone_id, zone_name, temp, is_off, serial)
+
+    async def send_zone_command(
+        self, zone_id: int, zone_name: str, temp: float, is_off: bool = False, serial: str | None = None
+    ) -> bool:
+        """Create an upd_zona command and return whether the cloud accepted it.
+
+        The answer is only `{"Result": true}`: it names neither the created command nor
+        its state, so a command is followed by the values its zone reports afterwards
+        (see acks.py).
+        """
         if not self.serial:
             await self.login()
+        serial = serial or self.serial
 
         cmd = {
             "shu_set": 2, 
@@ -189,7 +554,7 @@ class ProAirAPI:
             "pin": DEFAULT_PIN
         }
         payload = {
-            "Serial": self.serial, 
+            "Serial": serial, 
             "ZoneId": zone_id, 
             "Cmd": json.dumps(cmd, separators=(',', ':')), 
             "Pin": DEFAULT_PIN, 
@@ -197,11 +562,33 @@ class ProAirAPI:
             "Icon": 0
         }
         
-        url = f"{API_BASE_URL}/UpdateZonaData?create_command=true"
+        url = f"{self.base_url}/UpdateZonaData?create_command=true"
         # Content-Type header is needed for this POST
         data = await self._make_request("POST", url, json=payload, headers={"Content-Type": "application/json"})
-        
-        # Original logic returned True if status 200 (handled in make_request mostly)
-        # We assume if we got data back, it was successful enough? 
-        # API returns 200 even on logical errors sometimes, so we check existence of data
-        return bool(data)
+        # API returns 200 even on logical errors sometimes, so an empty body or an
+        # explicit false Result means the command was not created
+        return bool(data) and data.get("Result") is not False
+
+    async def set_zones(
+        self, updates: Iterable[ZoneUpdate], max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> list[bool | ProAirError]:
+        """Set many zones at once.
+
+        The protocol takes a single upd_zona command per POST, so the commands are sent
+        concurrently (at most `max_concurrency` in flight) and finish in about one round trip.
+        Returns one result per update, in order: whether the command was accepted, or its error.
+        """
+        if not self.serial:
+            await self.login()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def send(update: ZoneUpdate) -> bool | ProAirError:
+            async with semaphore:
+                try:
+                    return await self.send_zone_command(
+                        update.zone_id, update.zone_name, update.temp, update.is_off, serial=update.serial
+                    )
+                except ProAirError as err:
+                    return err
+
+        return list(await asyncio.gather(*(send(update) for update in updates)))
@@ -0,0 +1,8 @@
+"""Benchmarks for the ProAir integration, run against a local cloud simulator.
+
+Run them from the repository root, e.g. ``python -m benchmarks.bench_command_latency``.
+The integration modules are loaded through ``standalone``.
+"""
+from standalone import register_package
+
+register_package()
@@ -0,0 +1,55 @@
+"""Measure set_temperature latency while a slow GetCUState poll is in flight.
+
+    python -m benchmarks.bench_command_latency --state-latency 2 --commands 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from proair_tecnosystemi.api import ProAirAPI
+
+from .simulator import ProAirSimulator
+
+DEVICE_ID = "bench-device-0000"
+
+
+async def run(state_latency: float, command_latency: float, commands: int) -> None:
+    async with ProAirSimulator(
+        DEVICE_ID, state_latency=state_latency, command_latency=command_latency
+    ) as sim, aiohttp.ClientSession() as session:
+        api = ProAirAPI(session, "bench@example.com", "secret", DEVICE_ID, sim.base_url, sim.login_url)
+        await api.login()
+
+        latencies: list[float] = []
+        for index in range(commands):
+            # Keep a poll running so every command competes with it
+            poll = asyncio.create_task(api.get_state())
+            await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            await api.set_temperature(0, "Zone 0", 20 + index % 5)
+            latencies.append(time.perf_counter() - start)
+            await poll
+
+    latencies.sort()
+    print(f"commands:       {commands}")
+    print(f"poll latency:   {state_latency * 1000:.0f} ms")
+    print(f"server latency: {command_latency * 1000:.0f} ms per command")
+    print(f"p50:            {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"p99:            {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.1f} ms")
+    print(f"max:            {latencies[-1] * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--state-latency", type=float, default=1.0, help="GetCUState latency in seconds")
+    parser.add_argument("--command-latency", type=float, default=0.05, help="UpdateZonaData latency in seconds")
+    parser.add_argument("--commands", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.state_latency, args.command_latency, args.commands))
+
+
+if __name__ == "__main__":
+    main()
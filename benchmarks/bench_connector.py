@@ -0,0 +1,104 @@
+"""Per-request overhead of the connection pool, against the local simulator.
+
+    python -m benchmarks.bench_connector --tls --rounds 50 --units 4
+
+Each round polls every unit concurrently, like one coordinator refresh. Pools:
+
+* fresh:     a new connection per request, which is what a poll gets from Home
+             Assistant's shared pool once the 15 s keep-alive expired between polls
+* shared:    a connector configured like Home Assistant's shared one
+* dedicated: create_session(), the pool used by the integration
+
+Pass --idle to wait between rounds; with more than 15 s, "shared" reconnects every
+round too, while "dedicated" keeps its connections for KEEPALIVE_TIMEOUT.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import aiohttp
+
+from proair_tecnosystemi.api import ProAirAPI, create_session
+
+from .bench_load import percentile
+from .simulator import ProAirSimulator, SimulatorThread, self_signed_context
+
+DEVICE_ID = "bench-device-0000"
+# Limits and keep-alive of homeassistant.helpers.aiohttp_client
+HA_LIMIT = 4096
+HA_LIMIT_PER_HOST = 100
+HA_KEEPALIVE = 15.0
+
+
+def make_session(pool: str, ssl_context: bool) -> aiohttp.ClientSession:
+    if pool == "dedicated":
+        return create_session(ssl_context)
+    if pool == "fresh":
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True, ssl=ssl_context))
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+        limit=HA_LIMIT, limit_per_host=HA_LIMIT_PER_HOST, keepalive_timeout=HA_KEEPALIVE,
+        enable_cleanup_closed=True, ssl=ssl_context,
+    ))
+
+
+async def bench_pool(sim: ProAirSimulator, pool: str, args: argparse.Namespace) -> None:
+    # Certificates of the simulator are self-signed
+    ssl_context = False if args.tls else True
+    async with make_session(pool, ssl_context) as session:
+        api = ProAirAPI(session, "bench@example.com", "secret", DEVICE_ID, sim.base_url, sim.login_url)
+        await api.login()
+        latencies: list[float] = []
+        cpu = time.thread_time()
+        wall = time.perf_counter()
+        for _ in range(args.rounds):
+            async def poll(serial: str) -> None:
+                start = time.perf_counter()
+                await api.get_state(serial)
+                latencies.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(poll(serial) for serial in api.serials))
+            if args.idle:
+                await asyncio.sleep(args.idle)
+        wall = time.perf_counter() - wall
+        cpu = time.thread_time() - cpu
+
+    print(
+        f"{pool:>9}: p50 {statistics.median(latencies) * 1000:6.2f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:6.2f} ms, "
+        f"CPU {cpu / len(latencies) * 1000:6.3f} ms/request, {len(latencies) / wall:7.1f} requests/s"
+    )
+
+
+async def run(sim: ProAirSimulator, args: argparse.Namespace) -> None:
+    print(f"{args.rounds} rounds x {args.units} units, {'HTTPS' if args.tls else 'HTTP'}, idle {args.idle} s")
+    for pool in args.pools:
+        await bench_pool(sim, pool, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=4)
+    parser.add_argument("--zones", type=int, default=8, help="zones per unit")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency in seconds")
+    parser.add_argument("--idle", type=float, default=0.0, help="seconds between rounds")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+    parser.add_argument("--pools", nargs="+", default=["fresh", "shared", "dedicated"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        simulator = ProAirSimulator(
+            DEVICE_ID,
+            units=args.units,
+            zones=args.zones,
+            state_latency=args.latency,
+            ssl_context=self_signed_context(directory) if args.tls else None,
+        )
+        with SimulatorThread(simulator) as sim:
+            asyncio.run(run(sim, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""End-to-end load benchmark of ProAirAPI and the coordinator against the local simulator.
+
+    python -m benchmarks.bench_load --units 8 --zones 16 --latency 0.05 --requests 400
+
+Reports p50/p99 latency, requests/s and client CPU per request and per refresh.
+The simulator runs on its own thread, so the CPU figures only cover the client.
+The coordinator part needs homeassistant to be installed and is skipped otherwise.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import aiohttp
+
+from proair_tecnosystemi.api import ProAirAPI, ProAirError
+
+from .simulator import ProAirSimulator, SimulatorThread
+
+DEVICE_ID = "bench-device-0000"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def report(title: str, latencies: list[float], wall: float, cpu: float, operations: int, requests: int, errors: int) -> None:
+    print(f"{title}")
+    if latencies:
+        print(f"  p50 latency:    {statistics.median(latencies) * 1000:8.1f} ms")
+        print(f"  p99 latency:    {percentile(latencies, 0.99) * 1000:8.1f} ms")
+    print(f"  requests/s:     {requests / wall:8.1f}")
+    print(f"  CPU per op:     {cpu / max(1, operations) * 1000:8.3f} ms")
+    print(f"  errors:         {errors:8d}")
+
+
+async def bench_api(sim: ProAirSimulator, session: aiohttp.ClientSession, args: argparse.Namespace) -> None:
+    """Many GetCUState calls from `concurrency` workers sharing one account."""
+    api = ProAirAPI(session, "bench@example.com", "secret", DEVICE_ID, sim.base_url, sim.login_url)
+    await api.login()
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(args.requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in remaining:
+            start = time.perf_counter()
+            try:
+                await api.get_state(api.serials[index % len(api.serials)])
+            except ProAirError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    requests = sim.total_requests
+    cpu = time.thread_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - wall
+    cpu = time.thread_time() - cpu
+    report(
+        f"ProAirAPI.get_state x{args.requests}, concurrency {args.concurrency}",
+        latencies, wall, cpu, args.requests, sim.total_requests - requests, errors,
+    )
+    for name, stats in api.metrics.endpoints.items():
+        print(f"  {name}: {stats.outcomes}, p95 {stats.latency.quantile(0.95)} s")
+    print(f"  counters: {api.metrics.counters}")
+
+
+async def bench_coordinator(sim: ProAirSimulator, session: aiohttp.ClientSession, args: argparse.Namespace) -> None:
+    """Full coordinator refreshes: concurrent polls, parsing, zone index and diffs."""
+    try:
+        from homeassistant.core import HomeAssistant
+
+        from proair_tecnosystemi.coordinator import ProAirDataUpdateCoordinator
+    except ImportError:
+        print("coordinator: skipped, homeassistant is not installed")
+        return
+
+    hass = HomeAssistant(tempfile.mkdtemp())
+    api = ProAirAPI(session, "bench@example.com", "secret", DEVICE_ID, sim.base_url, sim.login_url)
+    coordinator = ProAirDataUpdateCoordinator(hass, api, args.max_concurrency, request_budget=0)
+    latencies: list[float] = []
+    errors = 0
+    await coordinator.async_refresh()
+
+    requests = sim.total_requests
+    cpu = time.thread_time()
+    wall = time.perf_counter()
+    for _ in range(args.refreshes):
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        latencies.append(time.perf_counter() - start)
+        errors += not coordinator.last_update_success
+    wall = time.perf_counter() - wall
+    cpu = time.thread_time() - cpu
+    report(
+        f"Coordinator refresh x{args.refreshes}, {args.units} units x {args.zones} zones, cap {args.max_concurrency}",
+        latencies, wall, cpu, args.refreshes, sim.total_requests - requests, errors,
+    )
+    await hass.async_stop(force=True)
+
+
+async def run(sim: ProAirSimulator, args: argparse.Namespace) -> None:
+    async with aiohttp.ClientSession() as session:
+        await bench_api(sim, session, args)
+        await bench_coordinator(sim, session, args)
+    print(f"simulator: {sim.requests} faults {sim.faults}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=4)
+    parser.add_argument("--zones", type=int, default=8, help="zones per unit")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency in seconds")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--refreshes", type=int, default=20)
+    parser.add_argument("--max-concurrency", type=int, default=4, help="coordinator concurrency cap")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=None, help="session lifetime in seconds")
+    parser.add_argument("--drift-rate", type=float, default=0.1, help="probability a zone changes per poll")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    simulator = ProAirSimulator(
+        DEVICE_ID,
+        units=args.units,
+        zones=args.zones,
+        state_latency=args.latency,
+        command_latency=args.latency,
+        login_latency=args.latency,
+        jitter=args.jitter,
+        unauthorized_rate=args.unauthorized_rate,
+        drop_rate=args.drop_rate,
+        token_ttl=args.token_ttl,
+        drift_rate=args.drift_rate,
+        seed=args.seed,
+    )
+    with SimulatorThread(simulator) as sim:
+        asyncio.run(run(sim, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""CPU and allocations per refresh for large GetCUState payloads.
+
+    python -m benchmarks.bench_refresh_cpu --units 8 --zones 64
+
+"before" decodes like aiohttp's resp.json() (bytes -> str -> stdlib json) and, like the
+original entities, finds the zone by scanning the unit's zone list and scales the value
+on every property read; "after" decodes the bytes with the fast decoder when available
+and scales every value once into indexed ZoneState records.
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from proair_tecnosystemi.api import json_loads
+from proair_tecnosystemi.models import build_zone_index
+
+from .simulator import unit_state
+
+READS_PER_REFRESH = 1  # state writes per entity between two polls
+
+
+def before(payloads: dict[str, bytes]) -> None:
+    units = {serial: json.loads(body.decode("utf-8")) for serial, body in payloads.items()}
+    for unit in units.values():
+        for entity in unit["Zones"]:
+            for _ in range(READS_PER_REFRESH):
+                for key in ("Temp", "SetTemp", "Umd", "IsOFF"):
+                    zone = next((zone for zone in unit.get("Zones", []) if zone["ZoneId"] == entity["ZoneId"]), {})
+                    val = zone.get(key)
+                    if key == "IsOFF":
+                        val is True
+                    elif val is not None:
+                        float(val) / 10
+
+
+def after(payloads: dict[str, bytes]) -> None:
+    units = {serial: json_loads(body) for serial, body in payloads.items()}
+    zones = build_zone_index(units)
+    for zone in zones.values():
+        for _ in range(READS_PER_REFRESH):
+            zone.temperature, zone.target_temperature, zone.humidity, zone.is_off
+
+
+def peak_memory(func: Callable[[dict[str, bytes]], Any], payloads: dict[str, bytes]) -> int:
+    """Peak memory traced while running one refresh."""
+    tracemalloc.start()
+    func(payloads)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    global READS_PER_REFRESH
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=8)
+    parser.add_argument("--zones", type=int, default=64, help="zones per unit")
+    parser.add_argument("--reads", type=int, default=1, help="state writes per entity per refresh")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    READS_PER_REFRESH = args.reads
+
+    payloads = {
+        f"SIM{unit:04d}": json.dumps(unit_state(f"SIM{unit:04d}", args.zones)).encode()
+        for unit in range(args.units)
+    }
+    size = sum(len(body) for body in payloads.values())
+    print(f"{args.units} units x {args.zones} zones, {size / 1024:.0f} KiB per refresh, decoder {json_loads.__module__}")
+    timings = {}
+    for name, func in (("before", before), ("after", after)):
+        seconds = min(timeit.repeat(lambda: func(payloads), number=args.number, repeat=5)) / args.number
+        peak = peak_memory(func, payloads)
+        timings[name] = seconds
+        print(f"{name:>6}: {seconds * 1000:7.3f} ms CPU, peak {peak / 1024:7.1f} KiB allocated")
+    print(f"speedup: {timings['before'] / timings['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-request CPU cost of advancing the token counter, before and after caching it.
+
+    python -m benchmarks.bench_token_crypto --iterations 20000
+"""
+import argparse
+import base64
+import timeit
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+from proair_tecnosystemi.api import ProAirAPI, ProAirCrypto
+
+DEVICE_ID = "bench-device-0000"
+TOKEN_PLAIN = "bench@example.com_5f2c9a7e41d3b086_1"
+
+
+class LegacyTokenCounter:
+    """The previous implementation: decrypt, split and re-encrypt with a new CBC cipher each time."""
+
+    def __init__(self, crypto: ProAirCrypto, token: str) -> None:
+        self.key = crypto.key
+        self.iv = crypto.iv
+        self.token = token
+
+    def next(self) -> str:
+        raw = base64.b64decode(self.token)
+        plain = unpad(AES.new(self.key, AES.MODE_CBC, self.iv).decrypt(raw), 16).decode("utf-8").strip()
+        parts = plain.split("_")
+        text = f"{'_'.join(parts[:-1])}_{int(parts[-1]) + 1}"
+        ct_bytes = AES.new(self.key, AES.MODE_CBC, self.iv).encrypt(pad(text.encode(), 16))
+        self.token = base64.b64encode(ct_bytes).decode()
+        return self.token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    api = ProAirAPI(None, "bench@example.com", "secret", DEVICE_ID)  # type: ignore[arg-type]
+    token = api.crypto.encrypt(TOKEN_PLAIN)
+    api._set_token(token)
+    legacy = LegacyTokenCounter(api.crypto, token)
+
+    def cached() -> None:
+        api._get_auth_headers(api._update_token_local())
+
+    def previous() -> None:
+        user_auth = base64.b64encode(f"{api.email}:PwdProAir".encode()).decode()
+        {"Token": legacy.next(), "Authorization": f"Basic {user_auth}"}
+
+    # Both counters must stay in sync for the comparison to be fair
+    cached()
+    previous()
+    assert api.token == legacy.token
+
+    results = {}
+    for name, func in (("before", previous), ("after", cached)):
+        seconds = min(timeit.repeat(func, number=args.iterations, repeat=5))
+        results[name] = seconds / args.iterations * 1e6
+        print(f"{name:>6}: {results[name]:.2f} us per request")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Cost of one entity state write for every zone: linear scans vs the coordinator zone index.
+
+    python -m benchmarks.bench_zone_lookup --units 4 --zones 8 16 64 256
+"""
+import argparse
+import timeit
+from typing import Any
+
+from proair_tecnosystemi.models import build_zone_index
+
+from .simulator import unit_state
+
+PROPERTIES = ("Temp", "SetTemp", "Umd")
+
+
+def linear_round(units: dict[str, dict[str, Any]]) -> None:
+    """The previous entities: every property read walks the zone list of the unit."""
+    for unit in units.values():
+        for entity in unit["Zones"]:
+            for key in (*PROPERTIES, "IsOFF"):
+                for zone in unit["Zones"]:
+                    if zone["ZoneId"] == entity["ZoneId"]:
+                        val = zone.get(key)
+                        if val is not None and key != "IsOFF":
+                            float(val) / 10
+                        break
+
+
+def indexed_round(units: dict[str, dict[str, Any]]) -> None:
+    """Build the index once per refresh, then each property read is a dict lookup."""
+    zones = build_zone_index(units)
+    for serial, unit in units.items():
+        for entity in unit["Zones"]:
+            key = (serial, entity["ZoneId"])
+            zones[key].is_off
+            zones[key].temperature
+            zones[key].target_temperature
+            zones[key].humidity
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=4)
+    parser.add_argument("--zones", type=int, nargs="+", default=[8, 32, 128, 512], help="zones per unit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'zones':>8} {'linear ms':>10} {'indexed ms':>11} {'speedup':>8}")
+    for zones in args.zones:
+        units = {f"SIM{unit:04d}": unit_state(f"SIM{unit:04d}", zones) for unit in range(args.units)}
+        number = max(1, 2000 // zones)
+        linear = min(timeit.repeat(lambda: linear_round(units), number=number, repeat=args.repeat)) / number
+        indexed = min(timeit.repeat(lambda: indexed_round(units), number=number, repeat=args.repeat)) / number
+        print(f"{zones * args.units:>8} {linear * 1000:>10.3f} {indexed * 1000:>11.3f} {linear / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
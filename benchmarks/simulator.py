@@ -0,0 +1,317 @@
+"""Local stand-in for the ProAir cloud endpoints used by the integration.
+
+Tokens follow the scheme of the real cloud: login hands out the AES encryption of
+``<session>_<counter>`` and every request must be signed with the same session and
+a counter the server has not seen yet, which the client obtains by incrementing it.
+"""
+import asyncio
+import json
+import random
+import secrets
+import ssl
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from aiohttp import web
+
+from proair_tecnosystemi.api import ProAirCrypto
+from proair_tecnosystemi.const import DEFAULT_PIN
+
+# Counters remembered per session to detect replays
+SEEN_COUNTERS = 4096
+
+
+class SimulatedSession:
+    """Token session handed out by a login."""
+
+    def __init__(self) -> None:
+        self.issued = time.monotonic()
+        self.highest = 0
+        self.seen = {0}
+        self.order: deque[int] = deque([0])
+
+    def accept(self, count: int, strict: bool) -> bool:
+        """Accept `count` unless it was already used (or, if strict, is not the highest)."""
+        if count in self.seen or (strict and count <= self.highest):
+            return False
+        self.seen.add(count)
+        self.order.append(count)
+        if len(self.order) > SEEN_COUNTERS:
+            self.seen.discard(self.order.popleft())
+        self.highest = max(self.highest, count)
+        return True
+
+
+class ProAirSimulator:
+    """Serve Login, GetCUState and UpdateZonaData on a local port.
+
+    Latencies are in seconds; latencies and fault rates can be changed while the
+    simulator is running. Fault rates are probabilities between 0 and 1.
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        units: int = 1,
+        zones: int = 4,
+        state_latency: float = 0.0,
+        command_latency: float = 0.0,
+        login_latency: float = 0.0,
+        jitter: float = 0.0,
+        unauthorized_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        token_ttl: float | None = None,
+        strict_counter: bool = False,
+        drift_rate: float = 0.0,
+        numbers_as_strings: bool = False,
+        seed: int | None = None,
+        ssl_context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.crypto = ProAirCrypto(device_id)
+        self.state_latency = state_latency
+        self.command_latency = command_latency
+        self.login_latency = login_latency
+        self.jitter = jitter
+        self.unauthorized_rate = unauthorized_rate
+        self.drop_rate = drop_rate
+        # Sessions older than this are rejected with 401, like an expired token
+        self.token_ttl = token_ttl
+        # Reject counters lower than the highest seen, not only replayed ones
+        self.strict_counter = strict_counter
+        # Probability that a zone temperature moves between two polls
+        self.drift_rate = drift_rate
+        # Report zone numbers as strings ("215"), as some units do
+        self.numbers_as_strings = numbers_as_strings
+        # Accept commands without applying them, like a unit that doesn't receive them
+        self.apply_commands = True
+        # Password accepted by Login, any when None
+        self.password: str | None = None
+        # serial -> (status, body) answered by GetCUState instead of the unit state
+        self.state_errors: dict[str, tuple[int, Any]] = {}
+        self.random = random.Random(seed)
+        # Serve HTTPS with this server context instead of plain HTTP
+        self.ssl_context = ssl_context
+        self.units: dict[str, dict[str, Any]] = {
+            f"SIM{unit:04d}": unit_state(f"SIM{unit:04d}", zones) for unit in range(units)
+        }
+        self.requests: dict[str, int] = {"login": 0, "state": 0, "command": 0}
+        # Zone commands received, in order: (serial, id_zona, t_set, is_off)
+        self.commands: list[tuple[str, int, int, bool]] = []
+        self.faults: dict[str, int] = {"unauthorized": 0, "dropped": 0, "expired": 0, "replayed": 0}
+        self._sessions: dict[str, SimulatedSession] = {}
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+        self.login_url = ""
+
+    async def __aenter__(self) -> "ProAirSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start serving on a free local port."""
+        app = web.Application()
+        app.router.add_post("/apiTS/v2/Login", self._handle_login)
+        app.router.add_get("/api/v1/GetCUState", self._handle_state)
+        app.router.add_post("/api/v1/UpdateZonaData", self._handle_command)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=self.ssl_context)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        scheme = "https" if self.ssl_context else "http"
+        self.base_url = f"{scheme}://{host}:{port}/api/v1"
+        self.login_url = f"{scheme}://{host}:{port}/apiTS/v2/Login"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def expire_sessions(self) -> None:
+        """Forget every token session, so the next requests are answered 401."""
+        self._sessions.clear()
+
+    async def _delay(self, latency: float) -> None:
+        await asyncio.sleep(latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0))
+
+    def _dropped(self, request: web.Request) -> bool:
+        """Close the connection without answering, with probability drop_rate."""
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.faults["dropped"] += 1
+            if request.transport is not None:
+                request.transport.abort()
+            return True
+        return False
+
+    def _authorized(self, request: web.Request) -> bool:
+        """Validate the token counter scheme."""
+        if self.unauthorized_rate and self.random.random() < self.unauthorized_rate:
+            self.faults["unauthorized"] += 1
+            return False
+        try:
+            session, _, counter = self.crypto.decrypt(request.headers["Token"]).rpartition("_")
+            count = int(counter)
+        except Exception:
+            return False
+        state = self._sessions.get(session)
+        if state is None:
+            return False
+        if self.token_ttl is not None and time.monotonic() - state.issued > self.token_ttl:
+            self.faults["expired"] += 1
+            return False
+        if not state.accept(count, self.strict_counter):
+            self.faults["replayed"] += 1
+            return False
+        return True
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        self.requests["login"] += 1
+        await self._delay(self.login_latency)
+        if self._dropped(request):
+            return web.Response()
+        if self.password is not None and (await request.json()).get("Password") != self.password:
+            return web.Response(status=401, text="Unauthorized")
+        session = secrets.token_hex(8)
+        self._sessions[session] = SimulatedSession()
+        token = self.crypto.encrypt(f"{session}_0")
+        plants = [{"ListDevices": [{"Serial": serial}]} for serial in self.units]
+        return web.json_response({"Token": token, "ListPlants": plants})
+
+    async def _handle_state(self, request: web.Request) -> web.Response:
+        self.requests["state"] += 1
+        await self._delay(self.state_latency)
+        if self._dropped(request):
+            return web.Response()
+        if not self._authorized(request):
+            return web.Response(status=401, text="Unauthorized")
+        if (error := self.state_errors.get(request.query.get("cuSerial", ""))) is not None:
+            return web.json_response(error[1], status=error[0])
+        unit = self.units.get(request.query.get("cuSerial", ""))
+        if unit is None or request.query.get("PIN") != DEFAULT_PIN:
+            return web.json_response({}, status=404)
+        if self.drift_rate:
+            for zone in unit["Zones"]:
+                if self.random.random() < self.drift_rate:
+                    zone["Temp"] += self.random.choice((-1, 1))
+        if self.numbers_as_strings:
+            unit = {
+                **unit,
+                "Zones": [
+                    {key: str(value) if key in ("Temp", "SetTemp", "Umd") else value for key, value in zone.items()}
+                    for zone in unit["Zones"]
+                ],
+            }
+        return web.json_response(unit)
+
+    async def _handle_command(self, request: web.Request) -> web.Response:
+        self.requests["command"] += 1
+        await self._delay(self.command_latency)
+        if self._dropped(request):
+            return web.Response()
+        if not self._authorized(request):
+            return web.Response(status=401, text="Unauthorized")
+        payload = await request.json()
+        unit = self.units.get(payload.get("Serial"))
+        if unit is None:
+            return web.json_response({}, status=404)
+        command = json.loads(payload["Cmd"])
+        self.commands.append((payload["Serial"], command["id_zona"], command["t_set"], bool(command["is_off"])))
+        for zone in unit["Zones"] if self.apply_commands else ():
+            if zone["ZoneId"] == command["id_zona"]:
+                zone["SetTemp"] = command["t_set"]
+                zone["IsOFF"] = bool(command["is_off"])
+        return web.json_response({"Result": True})
+
+
+class SimulatorThread:
+    """Run a simulator on its own event loop thread.
+
+    Its CPU time then stays out of ``time.thread_time()`` of the client being measured.
+    """
+
+    def __init__(self, simulator: ProAirSimulator) -> None:
+        self.simulator = simulator
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="proair-simulator", daemon=True)
+
+    def __enter__(self) -> ProAirSimulator:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.simulator.start(), self._loop).result()
+        return self.simulator
+
+    def __exit__(self, *exc_info: Any) -> None:
+        asyncio.run_coroutine_threadsafe(self.simulator.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def unit_state(serial: str, zones: int) -> dict[str, Any]:
+    """Synthetic GetCUState payload of a control unit with `zones` zones."""
+    return {
+        "Serial": serial,
+        "FWVer": "1.0.0",
+        "IsOFF": False,
+        "IsCooling": False,
+        "OperatingModeCooling": 0,
+        "TempCan": 215,
+        "Errors": [],
+        "Zones": [
+            {
+                "ZoneId": zone,
+                "Name": f"Zone {zone}",
+                "Temp": 200 + zone % 30,
+                "SetTemp": 210,
+                "Umd": 500,
+                "IsOFF": False,
+            }
+            for zone in range(zones)
+        ],
+    }
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    """Server TLS context with a throwaway certificate for 127.0.0.1 (needs cryptography)."""
+    import datetime
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = f"{directory}/cert.pem"
+    key_path = f"{directory}/key.pem"
+    with open(cert_path, "wb") as file:
+        file.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as file:
+        file.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    return context
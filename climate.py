@@ -1,13 +1,23 @@
+import asyncio
 import logging
+import time
+from datetime import timedelta
 from typing import Any
-from homeassistant.components.climate import ClimateEntity
-from homeassistant.components.climate.const import HVACMode, ClimateEntityFeature
+import voluptuous as vol
+from homeassistant.components.climate import ClimateEntity, DOMAIN as CLIMATE_DOMAIN
+from homeassistant.components.climate.const import HVACMode, ClimateEntityFeature, ATTR_HVAC_MODE
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.service import async_extract_entity_ids
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .api import ProAirError
 from .coordinator import ProAirDataUpdateCoordinator
-from .const import DOMAIN
+from .const import DOMAIN, SERVICE_SET_ZONES, SERVICE_GET_HISTORY, SERVICE_SET_SCHEDULE
+from .models import ZoneState
+from .schedule import WEEKDAYS, WeeklySchedule
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,20 +25,149 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     """Set up the ProAir climate platform from a config entry."""
     coordinator: ProAirDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     
-    # Non chiamiamo più api.get_state() qui, usiamo i dati del coordinator
-    if coordinator.data and "Zones" in coordinator.data:
-        _LOGGER.info("Detected %s ProAir zones", len(coordinator.data["Zones"]))
-        async_add_entities([ProAirZone(coordinator, zone) for zone in coordinator.data["Zones"]], True)
+    # Le entità nascono dalla mappa delle zone (salvata o appena letta), non dai dati:
+    # il primo aggiornamento può essere ancora in corso
+    entities = [
+        ProAirZone(coordinator, serial, zone)
+        for serial, zones in coordinator.topology.items()
+        for zone in zones
+    ]
+    if entities:
+        _LOGGER.info("Detected %s ProAir zones on %s control units", len(entities), len(coordinator.topology))
+        async_add_entities(entities)
     else:
         _LOGGER.error("No zones detected or data unavailable")
 
+    if not hass.services.has_service(DOMAIN, SERVICE_SET_ZONES):
+        async def async_handle_set_zones(call: ServiceCall) -> ServiceResponse:
+            return await _async_set_zones(hass, call)
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SET_ZONES,
+            async_handle_set_zones,
+            schema=SET_ZONES_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_GET_HISTORY):
+        async def async_handle_get_history(call: ServiceCall) -> ServiceResponse:
+            return await _async_get_history(hass, call)
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_GET_HISTORY,
+            async_handle_get_history,
+            schema=GET_HISTORY_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_SET_SCHEDULE):
+        async def async_handle_set_schedule(call: ServiceCall) -> None:
+            await _async_set_schedule(hass, call)
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SET_SCHEDULE,
+            async_handle_set_schedule,
+            schema=SET_SCHEDULE_SCHEMA,
+        )
+
+SET_ZONES_SCHEMA = vol.All(
+    cv.make_entity_service_schema({
+        vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+        vol.Optional(ATTR_HVAC_MODE): vol.In([HVACMode.HEAT, HVACMode.OFF]),
+    }),
+    cv.has_at_least_one_key(ATTR_TEMPERATURE, ATTR_HVAC_MODE),
+)
+
+async def _async_set_zones(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Apply the same change to many zones, one batch per coordinator."""
+    component = hass.data[CLIMATE_DOMAIN]
+    batches: dict[ProAirDataUpdateCoordinator, list[tuple[str, tuple[str, int, str, float, bool]]]] = {}
+    results: dict[str, Any] = {}
+
+    for entity_id in sorted(await async_extract_entity_ids(hass, call)):
+        entity = component.get_entity(entity_id)
+        if not isinstance(entity, ProAirZone):
+            continue
+        command = entity.zone_command(call.data.get(ATTR_TEMPERATURE), call.data.get(ATTR_HVAC_MODE))
+        if command is None:
+            results[entity_id] = {"success": False, "error": "Target temperature unknown"}
+            continue
+        batches.setdefault(entity.coordinator, []).append((entity_id, command))
+
+    outcomes = await asyncio.gather(
+        *(coordinator.async_set_zones([command for _, command in batch]) for coordinator, batch in batches.items())
+    )
+    for batch, batch_results in zip(batches.values(), outcomes):
+        for (entity_id, _), result in zip(batch, batch_results):
+            failed = isinstance(result, ProAirError)
+            results[entity_id] = {
+                "success": not failed and bool(result),
+                "error": str(result) if failed else None,
+            }
+    return {"results": results}
+
+ATTR_PERIOD = "period"
+ATTR_RESOLUTION = "resolution"
+
+GET_HISTORY_SCHEMA = cv.make_entity_service_schema({
+    vol.Optional(ATTR_PERIOD, default=timedelta(hours=24)): vol.All(cv.time_period, cv.positive_timedelta),
+    vol.Optional(ATTR_RESOLUTION): vol.All(cv.time_period, cv.positive_timedelta),
+})
+
+async def _async_get_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Return the downsampled history of the targeted zones."""
+    component = hass.data[CLIMATE_DOMAIN]
+    since = time.time() - call.data[ATTR_PERIOD].total_seconds()
+    resolution: timedelta | None = call.data.get(ATTR_RESOLUTION)
+    zones: dict[str, Any] = {}
+    for entity_id in sorted(await async_extract_entity_ids(hass, call)):
+        entity = component.get_entity(entity_id)
+        if isinstance(entity, ProAirZone):
+            zones[entity_id] = entity.history(since, int(resolution.total_seconds()) if resolution else None)
+    return {"zones": zones}
+
+ATTR_SLOTS = "slots"
+ATTR_DAYS = "days"
+ATTR_AT = "at"
+
+SCHEDULE_SLOT_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required(ATTR_DAYS): vol.All(cv.ensure_list, [vol.In(WEEKDAYS)]),
+        vol.Required(ATTR_AT): cv.time,
+        vol.Exclusive(ATTR_TEMPERATURE, "setpoint"): vol.All(vol.Coerce(float), vol.Range(min=10, max=35)),
+        vol.Exclusive(ATTR_HVAC_MODE, "setpoint"): vol.In([HVACMode.OFF]),
+    }),
+    cv.has_at_least_one_key(ATTR_TEMPERATURE, ATTR_HVAC_MODE),
+)
+
+SET_SCHEDULE_SCHEMA = cv.make_entity_service_schema({
+    vol.Required(ATTR_SLOTS): vol.All(cv.ensure_list, [SCHEDULE_SLOT_SCHEMA]),
+})
+
+async def _async_set_schedule(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Replace the weekly schedule of the targeted zones; no slots removes it."""
+    component = hass.data[CLIMATE_DOMAIN]
+    # Uno spegnimento è una fascia senza temperatura
+    schedule = WeeklySchedule([
+        {"days": slot[ATTR_DAYS], "at": slot[ATTR_AT], "temperature": slot.get(ATTR_TEMPERATURE)}
+        for slot in call.data[ATTR_SLOTS]
+    ])
+    for entity_id in await async_extract_entity_ids(hass, call):
+        entity = component.get_entity(entity_id)
+        if isinstance(entity, ProAirZone):
+            entity.set_schedule(schedule)
+
 class ProAirZone(CoordinatorEntity[ProAirDataUpdateCoordinator], ClimateEntity):
-    def __init__(self, coordinator: ProAirDataUpdateCoordinator, zone_data: dict[str, Any]) -> None:
+    def __init__(self, coordinator: ProAirDataUpdateCoordinator, serial: str, zone_data: dict[str, Any]) -> None:
         super().__init__(coordinator)
         self._api = coordinator.api
+        self._serial = serial
         self._id = zone_data["ZoneId"]
         self._name = zone_data["Name"]
-        self._attr_unique_id = f"proair_{coordinator.api.serial}_{zone_data['ZoneId']}"
+        self._attr_unique_id = f"proair_{serial}_{zone_data['ZoneId']}"
         
         # Caratteristiche del termostato
         self._attr_hvac_modes = [HVACMode.HEAT, HVACMode.OFF]
@@ -41,12 +180,30 @@ class ProAirZone(CoordinatorEntity[ProAirDataUpdateCoordinator], ClimateEntity):
         self._attr_translation_key = "proair_zone"
 
     @property
-    def _zone_data(self) -> dict[str, Any]:
-        """Ottiene i dati aggiornati per questa zona dal coordinator."""
-        for zone in self.coordinator.data.get("Zones", []):
-            if zone["ZoneId"] == self._id:
-                return zone
-        return {}
+    def _zone(self) -> ZoneState | None:
+        """Ottiene i dati aggiornati per questa zona dall'indice del coordinator."""
+        return self.coordinator.get_zone(self._serial, self._id)
+
+    def history(self, since: float, resolution: int | None = None) -> list[dict[str, Any]]:
+        """Storico aggregato della zona dal timestamp `since`."""
+        return self.coordinator.history.query(self._serial, self._id, since, resolution)
+
+    @callback
+    def set_schedule(self, schedule: WeeklySchedule) -> None:
+        """Sostituisce la programmazione settimanale della zona."""
+        self.coordinator.schedule.async_set(self._serial, self._id, schedule)
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Scrive lo stato solo se i dati della zona sono cambiati."""
+        if self.coordinator.zone_changed(self._serial, self._id):
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Disponibile finché c'è uno stato recente della zona, anche se servito dalla cache."""
+        return super().available and self._zone is not None
 
     @property
     def name(self) -> str:
@@ -58,36 +215,48 @@ class ProAirZone(CoordinatorEntity[ProAirDataUpdateCoordinator], ClimateEntity):
 
     @property
     def hvac_mode(self) -> HVACMode:
-        # IsOFF nel JSON è booleano
-        return HVACMode.OFF if self._zone_data.get("IsOFF") is True else HVACMode.HEAT
+        zone = self._zone
+        return HVACMode.OFF if zone is not None and zone.is_off else HVACMode.HEAT
 
     @property
     def current_temperature(self) -> float | None:
-        val = self._zone_data.get("Temp")
-        if val is not None:
-             return float(val) / 10
-        return None
+        zone = self._zone
+        return zone.temperature if zone is not None else None
 
     @property
     def target_temperature(self) -> float | None:
-        val = self._zone_data.get("SetTemp")
-        if val is not None:
-            return float(val) / 10
-        return None
+        zone = self._zone
+        return zone.target_temperature if zone is not None else None
 
     @property
     def current_humidity(self) -> float | None:
-        val = self._zone_data.get("Umd")
-        if val is not None:
-            return float(val) / 10
-        return None
+        zone = self._zone
+        return zone.humidity if zone is not None else None
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return the state attributes."""
-        return {
-            "last_update": self.coordinator.data.get("last_update")
+        # Esito dell'ultimo comando: pending finché la centralina non lo conferma
+        ack = self.coordinator.acks.get(self._serial, self._id)
+        attributes = {
+            **self.coordinator.unit_attributes(self._serial),
+            "command_status": ack.status if ack is not None else None,
         }
+        # Prossimo cambio della programmazione locale, se presente (None = spegnimento)
+        if change := self.coordinator.schedule.next_change(self._serial, self._id):
+            attributes["next_schedule_change"] = change[0].isoformat()
+            attributes["next_schedule_temperature"] = change[1]
+        return attributes
+
+    def zone_command(self, temp: float | None, hvac_mode: HVACMode | None) -> tuple[str, int, str, float, bool] | None:
+        """Comando (serial, zona, nome, temperatura, spento) per la modifica richiesta."""
+        if temp is None:
+            temp = self.target_temperature
+            if temp is None:
+                return None
+        # Come async_set_temperature, impostare una temperatura accende la zona
+        is_off = hvac_mode == HVACMode.OFF
+        return (self._serial, self._id, self._name, temp, is_off)
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Imposta una nuova temperatura target."""
@@ -97,9 +266,8 @@ class ProAirZone(CoordinatorEntity[ProAirDataUpdateCoordinator], ClimateEntity):
             
         _LOGGER.debug("Sending temperature command for %s: %s degrees", self._name, temp)
         
-        if await self._api.set_temperature(self._id, self._name, temp):
-            # Request immediate update after command
-            await self.coordinator.async_request_refresh()
+        # Il nuovo valore viene mostrato subito e resta finché la centralina non lo conferma
+        await self.coordinator.async_set_zone(self._serial, self._id, self._name, temp)
     
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Accende o spegne la zona."""
@@ -108,5 +276,5 @@ class ProAirZone(CoordinatorEntity[ProAirDataUpdateCoordinator], ClimateEntity):
         is_off = (hvac_mode == HVACMode.OFF)
         temp = self.target_temperature
         
-        if temp is not None and await self._api.set_temperature(self._id, self._name, temp, is_off):
-             await self.coordinator.async_request_refresh()
+        if temp is not None:
+            await self.coordinator.async_set_zone(self._serial, self._id, self._name, temp, is_off)
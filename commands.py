@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from .api import ProAirAPI, ProAirError, ZoneUpdate
+from .const import COMMAND_DEBOUNCE, COMMAND_MAX_DELAY, DEFAULT_MAX_CONCURRENCY
+
+_LOGGER = logging.getLogger(__name__)
+
+class ZoneCommand:
+    """Latest requested state of a zone, waiting to be sent."""
+
+    __slots__ = ("zone_name", "temp", "is_off", "future")
+
+    def __init__(self, zone_name: str, temp: float, is_off: bool, future: asyncio.Future[bool]) -> None:
+        self.zone_name = zone_name
+        self.temp = temp
+        self.is_off = is_off
+        self.future = future
+
+class ProAirCommandQueue:
+    """Per-zone command queue coalescing bursts of zone updates.
+
+    Only the latest target and on/off state of a zone is kept while a control unit's
+    window is open. When it closes, the pending zones of that unit are sent together
+    and `on_flush` is called once.
+    """
+
+    def __init__(
+        self,
+        api: ProAirAPI,
+        on_flush: Callable[[], Awaitable[None]] | None = None,
+        debounce: float = COMMAND_DEBOUNCE,
+        max_delay: float = COMMAND_MAX_DELAY,
+    ) -> None:
+        self._api = api
+        self._on_flush = on_flush
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._pending: dict[str, dict[int, ZoneCommand]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._opened: dict[str, float] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        # One batch in flight per control unit, so a newer batch can't overtake an older one
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def async_set_zone(self, serial: str, zone_id: int, zone_name: str, temp: float, is_off: bool = False) -> bool:
+        """Queue a zone update and wait until the coalesced command has been sent."""
+        loop = asyncio.get_running_loop()
+        unit = self._pending.setdefault(serial, {})
+        command = unit.get(zone_id)
+        if command is None:
+            command = unit[zone_id] = ZoneCommand(zone_name, temp, is_off, loop.create_future())
+        else:
+            _LOGGER.debug("Coalescing command for zone %s of %s", zone_id, serial)
+            command.temp = temp
+            command.is_off = is_off
+
+        # Restart the window on every command, but never hold a unit longer than max_delay
+        opened = self._opened.setdefault(serial, loop.time())
+        delay = min(self._debounce, max(0.0, opened + self._max_delay - loop.time()))
+        if timer := self._timers.pop(serial, None):
+            timer.cancel()
+        self._timers[serial] = loop.call_later(delay, self._schedule_flush, serial)
+
+        return await asyncio.shield(command.future)
+
+    def _schedule_flush(self, serial: str) -> None:
+        task = asyncio.get_running_loop().create_task(self._async_flush_unit(serial))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_flush_unit(self, serial: str) -> None:
+        """Send every pending command of a control unit, then refresh once.
+
+        Batches of the same unit are sent one after the other; commands queued while the
+        previous batch is in flight go out with the next one.
+        """
+        self._timers.pop(serial, None)
+        self._opened.pop(serial, None)
+        async with self._locks.setdefault(serial, asyncio.Lock()):
+            sent = await self._async_send_pending(serial)
+        if sent and self._on_flush is not None:
+            await self._on_flush()
+
+    async def _async_send_pending(self, serial: str) -> bool:
+        """Send the pending commands of a unit, holding its lock; return whether any was accepted."""
+        commands = self._pending.pop(serial, {})
+        if not commands:
+            return False
+
+        start = time.monotonic()
+        try:
+            results = await self._api.set_zones(
+                ZoneUpdate(zone_id, command.zone_name, command.temp, command.is_off, serial)
+                for zone_id, command in commands.items()
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            results = [err] * len(commands)
+
+        sent = False
+        for command, result in zip(commands.values(), results):
+            if command.future.done():
+                continue
+            if isinstance(result, Exception):
+                command.future.set_exception(result)
+            else:
+                sent = sent or bool(result)
+                command.future.set_result(result)
+
+        _LOGGER.debug(
+            "Sent %s coalesced commands to %s in %.3f s", len(commands), serial, time.monotonic() - start
+        )
+        return sent
+
+    async def async_send_now(
+        self, updates: list[ZoneUpdate], max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> list[bool | ProAirError]:
+        """Send zone updates right away, bypassing the coalescing window but not the order.
+
+        Each unit's updates wait for its batch in flight, and commands still queued for
+        the unit are sent before them: being older, they must not land last.
+        Returns one result per update, in order, like `ProAirAPI.set_zones`.
+        """
+        units: dict[str | None, list[int]] = {}
+        for index, update in enumerate(updates):
+            units.setdefault(update.serial, []).append(index)
+        results: list[bool | ProAirError] = [False] * len(updates)
+
+        async def send(serial: str | None, indexes: list[int]) -> None:
+            async with self._locks.setdefault(serial or "", asyncio.Lock()):
+                if serial is not None and serial in self._pending:
+                    if timer := self._timers.pop(serial, None):
+                        timer.cancel()
+                    self._opened.pop(serial, None)
+                    await self._async_send_pending(serial)
+                unit_results = await self._api.set_zones([updates[index] for index in indexes], max_concurrency)
+            for index, result in zip(indexes, unit_results):
+                results[index] = result
+
+        await asyncio.gather(*(send(serial, indexes) for serial, indexes in units.items()))
+        return results
+
+    async def async_flush(self) -> None:
+        """Send everything still pending right away."""
+        for serial in list(self._timers):
+            self._timers.pop(serial).cancel()
+        await asyncio.gather(*(self._async_flush_unit(serial) for serial in list(self._pending)))
@@ -1,21 +1,45 @@
 import voluptuous as vol
+from collections.abc import Mapping
 from typing import Any
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-from homeassistant.helpers import aiohttp_client
-from .api import ProAirAPI
-from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD, CONF_DEVICE_ID
+from .api import ProAirAPI, ProAirAuthError
+from .session import async_close_unused_session, async_get_session
+from .store import ProAirSessionStore, account_id
+from .const import (
+    DOMAIN,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_DEVICE_ID,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_BUDGET,
+    CONF_STALE_WINDOW,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_BUDGET,
+    DEFAULT_STALE_WINDOW,
+)
 
 class ProAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle ProAir configuration flow."""
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> config_entries.OptionsFlow:
+        """Return the options flow handler."""
+        return ProAirOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """First step: credentials input."""
         errors: dict[str, str] = {}
         
         if user_input is not None:
-            session = aiohttp_client.async_get_clientsession(self.hass)
+            # One entry per account: a second one would only poll the same control units again
+            await self.async_set_unique_id(account_id(user_input[CONF_USERNAME], user_input[CONF_DEVICE_ID]))
+            self._abort_if_unique_id_configured()
+
+            session = async_get_session(self.hass)
             api = ProAirAPI(
                 session,
                 user_input[CONF_USERNAME], 
@@ -25,6 +49,10 @@ class ProAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             try:
                 # Credentials validation
                 if await api.login():
+                    # Setup resumes this session instead of logging in again
+                    await ProAirSessionStore(
+                        self.hass, user_input[CONF_USERNAME], user_input[CONF_DEVICE_ID]
+                    ).async_save(api)
                     return self.async_create_entry(
                         title=user_input[CONF_USERNAME], 
                         data=user_input
@@ -32,6 +60,7 @@ class ProAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "invalid_auth"
             except Exception:
                 errors["base"] = "cannot_connect"
+            await async_close_unused_session(self.hass)
 
         # Schema for form fields
         return self.async_show_form(
@@ -43,3 +72,76 @@ class ProAirConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             }),
             errors=errors,
         )
+
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """The cloud rejected the saved credentials."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Ask for the new password of the account."""
+        errors: dict[str, str] = {}
+        entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        assert entry is not None
+
+        if user_input is not None:
+            api = ProAirAPI(
+                async_get_session(self.hass),
+                entry.data[CONF_USERNAME],
+                user_input[CONF_PASSWORD],
+                entry.data[CONF_DEVICE_ID],
+            )
+            try:
+                if await api.login():
+                    await ProAirSessionStore(
+                        self.hass, entry.data[CONF_USERNAME], entry.data[CONF_DEVICE_ID]
+                    ).async_save(api)
+                    self.hass.config_entries.async_update_entry(
+                        entry, data={**entry.data, CONF_PASSWORD: user_input[CONF_PASSWORD]}
+                    )
+                    await self.hass.config_entries.async_reload(entry.entry_id)
+                    return self.async_abort(reason="reauth_successful")
+                errors["base"] = "invalid_auth"
+            except ProAirAuthError:
+                errors["base"] = "invalid_auth"
+            except Exception:
+                errors["base"] = "cannot_connect"
+            await async_close_unused_session(self.hass)
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            description_placeholders={"username": entry.data[CONF_USERNAME]},
+            data_schema=vol.Schema({vol.Required(CONF_PASSWORD): str}),
+            errors=errors,
+        )
+
+
+class ProAirOptionsFlow(config_entries.OptionsFlow):
+    """Handle ProAir options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Manage polling options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_MAX_CONCURRENCY,
+                    default=options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                vol.Optional(
+                    CONF_REQUEST_BUDGET,
+                    default=options.get(CONF_REQUEST_BUDGET, DEFAULT_REQUEST_BUDGET),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_STALE_WINDOW,
+                    default=options.get(CONF_STALE_WINDOW, DEFAULT_STALE_WINDOW),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            }),
+        )
@@ -5,8 +5,75 @@ DEFAULT_PIN = "2226"
 API_BASE_URL = "https://proair.azurewebsites.net/api/v1"
 API_LOGIN_URL = "https://proair.azurewebsites.net/apiTS/v2/Login"
 
+# Saved login session (token and serials), one file per account
+STORAGE_VERSION = 1
+# Token increments are saved SESSION_SAVE_DELAY seconds after the first one not yet saved
+SESSION_SAVE_DELAY = 30
+# Zone layout of the account, saved shortly after a poll finds a new one
+TOPOLOGY_SAVE_DELAY = 5
+# Zone schedules of the account, saved shortly after they are changed
+SCHEDULE_SAVE_DELAY = 5
+
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_DEVICE_ID = "device_id"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_REQUEST_BUDGET = "request_budget"
+CONF_STALE_WINDOW = "stale_window"
+
+DEFAULT_MAX_CONCURRENCY = 4
+# Requests per hour an account may send to the cloud, polls and commands included
+DEFAULT_REQUEST_BUDGET = 600
+# Seconds the last known state of a control unit keeps being served while the cloud fails
+DEFAULT_STALE_WINDOW = 900
+
+# Polling intervals (seconds): UPDATE_INTERVAL is used when nothing happens, FAST_UPDATE_INTERVAL
+# for ACTIVITY_WINDOW after a command or a detected change. Stable readings and errors back off
+# exponentially up to MAX_UPDATE_INTERVAL.
+UPDATE_INTERVAL = 60
+FAST_UPDATE_INTERVAL = 15
+MAX_UPDATE_INTERVAL = 600
+ACTIVITY_WINDOW = 300
+STABLE_POLLS_BEFORE_BACKOFF = 5
+
+# Circuit breaker: after this many consecutive failed exchanges, requests are refused for
+# CIRCUIT_BASE_DELAY seconds, doubling on every further failure up to CIRCUIT_MAX_DELAY
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_BASE_DELAY = 30
+CIRCUIT_MAX_DELAY = 900
+
+# Serials discovered at login are trusted for this long (seconds), then a login looks for
+# control units added to or removed from the account, even when a saved token still works
+SERIALS_REFRESH_INTERVAL = 86400
+
+SERVICE_SET_ZONES = "set_zones"
+SERVICE_GET_HISTORY = "get_history"
+SERVICE_SET_SCHEDULE = "set_schedule"
+
+# Commands for the same control unit sent within this window (seconds) are coalesced
+COMMAND_DEBOUNCE = 1.0
+COMMAND_MAX_DELAY = 3.0
+# Sent commands are confirmed by fetching only their control unit, COMMAND_ACK_DELAY seconds
+# after sending and then backing off up to COMMAND_ACK_MAX_DELAY, for COMMAND_ACK_TIMEOUT seconds
+COMMAND_ACK_DELAY = 3.0
+COMMAND_ACK_MAX_DELAY = 24.0
+COMMAND_ACK_TIMEOUT = 120.0
+
+# Zone history: samples are averaged into HISTORY_BUCKET-second buckets, the last
+# HISTORY_BUCKETS of which are kept (one week); changes are saved HISTORY_SAVE_DELAY seconds
+# after the first one not yet saved, so a save is never postponed by later polls.
+# Buckets older than the current HISTORY_ARCHIVE_PERIOD are saved once, separately, so
+# those saves only rewrite the buckets of the current period.
+HISTORY_BUCKET = 300
+HISTORY_BUCKETS = 2016
+HISTORY_SAVE_DELAY = 900
+HISTORY_ARCHIVE_PERIOD = 86400
 
-UPDATE_INTERVAL = 60 
+# Dedicated connection pool to the ProAir cloud, shared by every config entry.
+# Idle connections are kept longer than the polling interval so polls reuse them
+# instead of paying a new TCP and TLS handshake.
+CONNECTION_LIMIT = 16
+KEEPALIVE_TIMEOUT = 120
+DNS_CACHE_TTL = 300
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 20
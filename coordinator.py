@@ -1,24 +1,88 @@
+import asyncio
 import logging
-from datetime import timedelta
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
 from typing import Any
 import async_timeout
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
-from homeassistant.exceptions import ConfigEntryAuthFailed 
+from homeassistant.exceptions import ConfigEntryAuthFailed
 
-from .api import ProAirAPI, ProAirAuthError, ProAirConnectionError
-from .const import DOMAIN, UPDATE_INTERVAL
+from .acks import CommandAck, ProAirCommandTracker
+from .api import (
+    ProAirAPI,
+    ProAirError,
+    ProAirAuthError,
+    ProAirConnectionError,
+    ProAirServerError,
+    ZoneUpdate,
+)
+from .commands import ProAirCommandQueue
+from .history import ProAirHistory
+from .schedule import ProAirScheduleEngine
+from .const import (
+    DOMAIN,
+    UPDATE_INTERVAL,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_BUDGET,
+    DEFAULT_STALE_WINDOW,
+)
+from .models import UnitState, ZoneState, build_topology, build_zone_index, scaled, unit_values
+from .scheduler import ProAirPollScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
-class ProAirDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
-    """Class to manage fetching ProAir data."""
+class ZonePatch:
+    """Optimistic values written into the cached snapshot of a zone."""
+
+    __slots__ = ("values", "previous", "sent")
+
+    def __init__(self, values: dict[str, Any], previous: dict[str, Any]) -> None:
+        self.values = values
+        self.previous = previous
+        # Loop time at which the cloud accepted the command, None while still queued
+        self.sent: float | None = None
+
+def _control_changed(
+    previous_zones: dict[tuple[str, int], ZoneState],
+    zones: dict[tuple[str, int], ZoneState],
+    previous_units: dict[str, UnitState],
+    units: dict[str, UnitState],
+) -> bool:
+    """Return whether someone changed the installation between two polls.
+
+    Setpoints, on/off states, unit modes and zones or units appearing or going away
+    count; measured temperature and humidity drift on almost every poll and don't.
+    """
+    if zones.keys() != previous_zones.keys() or units.keys() != previous_units.keys():
+        return True
+    for key, zone in zones.items():
+        previous = previous_zones[key]
+        if zone.target_temperature != previous.target_temperature or zone.is_off != previous.is_off:
+            return True
+    return any(unit.mode != previous_units[serial].mode for serial, unit in units.items())
+
+class ProAirDataUpdateCoordinator(DataUpdateCoordinator[dict[str, dict[str, Any]]]):
+    """Class to manage fetching ProAir data.
 
-    def __init__(self, hass: HomeAssistant, api: ProAirAPI) -> None:
+    Data is keyed by control unit serial, each value being the GetCUState payload of that unit.
+    When a unit can't be fetched, its last known state is served, marked stale, for up to
+    `stale_window` seconds while the scheduler retries with backoff.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: ProAirAPI,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        request_budget: int = DEFAULT_REQUEST_BUDGET,
+        stale_window: float = DEFAULT_STALE_WINDOW,
+    ) -> None:
         """Initialize."""
         super().__init__(
             hass,
@@ -27,20 +91,432 @@ class ProAirDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             update_interval=timedelta(seconds=UPDATE_INTERVAL),
         )
         self.api = api
+        self.max_concurrency = max(1, max_concurrency)
+        self.stale_window = stale_window
+        # Loop time of the last successful fetch of each unit, and units currently served from cache
+        self._fetched: dict[str, float] = {}
+        self._stale: set[str] = set()
+        # Set when every unit failed and only cached state was served
+        self._poll_error: BaseException | None = None
+        # Adapts update_interval after every poll and command
+        self.scheduler = ProAirPollScheduler(request_budget)
+        # Zone commands are coalesced per control unit; their result is patched into
+        # the snapshot right away and kept until the unit confirms it, which is checked
+        # by fetching only that unit instead of polling every unit faster
+        self.commands = ProAirCommandQueue(api)
+        self._patches: dict[tuple[str, int], ZonePatch] = {}
+        self.acks = ProAirCommandTracker(self._async_check_unit, self._async_command_timed_out)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # (serial, ZoneId) -> parsed zone, rebuilt once per refresh
+        self.zones: dict[tuple[str, int], ZoneState] = {}
+        # serial -> parsed unit-level values, rebuilt only when the unit reports new ones
+        self.units: dict[str, UnitState] = {}
+        # Bumped on every notification: values derived from the snapshot are computed
+        # once per version and shared by the entities reading them
+        self.version = 0
+        self._derived_version = -1
+        self._unit_attributes: dict[str, dict[str, Any]] = {}
+        # Zone layout of every unit, known from storage before the first poll;
+        # on_topology_change is called when a poll finds a different one
+        self.topology: dict[str, list[dict[str, Any]]] = {}
+        self.on_topology_change: Callable[[], None] | None = None
+        # The poller isn't tied to a config entry: called instead of starting a reauth flow
+        self.on_auth_failed: Callable[[], None] | None = None
+        # Downsampled history of every zone, sampled on each poll
+        self.history = ProAirHistory()
+        # Local weekly schedules of the zones, sending only the setpoints that differ
+        self.schedule = ProAirScheduleEngine(hass, self)
+        # Zones and units whose values changed since listeners were last notified.
+        # None means everything, e.g. on the first refresh or when availability changes.
+        self._changed_zones: set[tuple[str, int]] | None = None
+        self._changed_units: set[str] | None = None
+        self._notified_success: bool | None = None
+        # Set by a poll that found a control change (see _control_changed): polls fast for a while
+        self._control_changed_in_poll = False
+
+    def apply_options(self, max_concurrency: int, request_budget: int, stale_window: float) -> None:
+        """Use new polling options from the next poll on."""
+        if max(1, max_concurrency) != self.max_concurrency:
+            self.max_concurrency = max(1, max_concurrency)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.scheduler.budget = request_budget
+        self.stale_window = stale_window
+
+    def zone_changed(self, serial: str, zone_id: int) -> bool:
+        """Return whether a zone changed in the update being notified."""
+        return self._changed_zones is None or (serial, zone_id) in self._changed_zones
+
+    def unit_changed(self, serial: str) -> bool:
+        """Return whether unit-level values changed in the update being notified."""
+        return self._changed_units is None or serial in self._changed_units
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify listeners; entities skip the state write when their data didn't change."""
+        if self.last_update_success != self._notified_success:
+            self._changed_zones = self._changed_units = None
+            self._notified_success = self.last_update_success
+        self.version += 1
+        try:
+            super().async_update_listeners()
+        finally:
+            self._changed_zones = self._changed_units = None
+
+    @callback
+    def _async_notify_zone(self, serial: str, zone_id: int) -> None:
+        """Notify listeners of a change limited to a single zone."""
+        self.async_notify_zones([(serial, zone_id)])
+
+    @callback
+    def async_notify_zones(self, zones: Iterable[tuple[str, int]]) -> None:
+        """Notify listeners of a change limited to some zones, e.g. of their attributes."""
+        self._changed_zones = set(zones)
+        self._changed_units = set()
+        self.async_update_listeners()
+
+    def get_unit(self, serial: str) -> dict[str, Any]:
+        """Return the GetCUState payload of a unit, empty until it has been fetched."""
+        return (self.data or {}).get(serial, {})
+
+    def get_unit_state(self, serial: str) -> UnitState | None:
+        """Return the parsed unit-level values of a unit."""
+        return self.units.get(serial)
+
+    def unit_attributes(self, serial: str) -> dict[str, Any]:
+        """Attributes every entity of a unit carries, built once per snapshot version."""
+        if self._derived_version != self.version:
+            self._unit_attributes.clear()
+            self._derived_version = self.version
+        attributes = self._unit_attributes.get(serial)
+        if attributes is None:
+            attributes = self._unit_attributes[serial] = {
+                "last_update": self.get_unit(serial).get("last_update"),
+                "stale": serial in self._stale,
+            }
+        return attributes
+
+    def unit_available(self, serial: str) -> bool:
+        """Return whether there is fresh or still acceptable cached state for a unit."""
+        return self.data is not None and serial in self.data
+
+    def is_stale(self, serial: str) -> bool:
+        """Return whether a unit is served from cache because the cloud failed."""
+        return serial in self._stale
+
+    def data_age(self, serial: str) -> float | None:
+        """Seconds since the state of a unit was last fetched."""
+        fetched = self._fetched.get(serial)
+        return self.hass.loop.time() - fetched if fetched is not None else None
+
+    def get_zone(self, serial: str, zone_id: int) -> ZoneState | None:
+        """Return the parsed state of a zone."""
+        return self.zones.get((serial, zone_id))
+
+    def _find_zone(self, serial: str, zone_id: int) -> dict[str, Any] | None:
+        """Return the cached zone dict, if known."""
+        zone = self.zones.get((serial, zone_id))
+        return zone.raw if zone is not None else None
+
+    def _apply_patch(self, serial: str, zone_id: int, values: dict[str, Any]) -> None:
+        """Write optimistic values into the cached zone and notify listeners."""
+        zone = self._find_zone(serial, zone_id)
+        if zone is None:
+            return
+        patch = self._patches.get((serial, zone_id))
+        if patch is None:
+            previous = {key: zone.get(key) for key in values}
+            patch = self._patches[(serial, zone_id)] = ZonePatch(values, previous)
+        else:
+            # Keep the device values captured by the first patch for rollbacks
+            patch.values = values
+            patch.sent = None
+        zone.update(values)
+        self.zones[(serial, zone_id)] = ZoneState(serial, zone)
+        self._async_notify_zone(serial, zone_id)
+
+    def _rollback_patch(self, serial: str, zone_id: int) -> None:
+        """Restore the values the device last reported for a zone."""
+        patch = self._patches.pop((serial, zone_id), None)
+        zone = self._find_zone(serial, zone_id)
+        if patch is None or zone is None:
+            return
+        zone.update(patch.previous)
+        self.zones[(serial, zone_id)] = ZoneState(serial, zone)
+        self._async_notify_zone(serial, zone_id)
+
+    def _reconcile_patches(
+        self, zones: dict[tuple[str, int], ZoneState], poll_started: float, serials: set[str] | None = None
+    ) -> None:
+        """Match optimistic patches of `serials` (all units by default) against freshly polled data."""
+        for (serial, zone_id), patch in list(self._patches.items()):
+            if serials is not None and serial not in serials:
+                continue
+            state = zones.get((serial, zone_id))
+            if state is None:
+                del self._patches[(serial, zone_id)]
+            elif patch.sent is None or patch.sent > poll_started or self.acks.is_pending(serial, zone_id):
+                # The poll may predate the command or the unit not have applied it yet:
+                # keep showing the requested values, remembering the reported ones for rollbacks
+                if ZoneState(serial, {**state.raw, **patch.values}) != state:
+                    patch.previous = {key: state.raw.get(key) for key in patch.values}
+                state.raw.update(patch.values)
+                zones[(serial, zone_id)] = ZoneState(serial, state.raw)
+            else:
+                # Compare parsed values: the unit may report SetTemp 215 as "215"
+                if ZoneState(serial, {**state.raw, **patch.values}) != state:
+                    _LOGGER.debug(
+                        "Zone %s of %s reports %s instead of %s, rolling back",
+                        zone_id, serial, {key: state.raw.get(key) for key in patch.values}, patch.values,
+                    )
+                del self._patches[(serial, zone_id)]
 
-    async def _async_update_data(self) -> dict[str, Any]:
-        """Fetch data from API endpoint."""
+    def _update_topology(self, units: dict[str, dict[str, Any]]) -> None:
+        """Track the zone layout, keeping the last known one of units missing from this poll.
+
+        Only units that reported a zone list count, and a known layout is never replaced
+        by an empty one: that would drop the unit's entities on the next restart.
+        """
+        fetched = {
+            serial: zones
+            for serial, zones in build_topology(
+                {serial: unit for serial, unit in units.items() if isinstance(unit.get("Zones"), list)}
+            ).items()
+            if zones or not self.topology.get(serial)
+        }
+        topology = {
+            serial: fetched[serial] if serial in fetched else self.topology[serial]
+            for serial in self.api.serials
+            if serial in fetched or serial in self.topology
+        }
+        if topology != self.topology:
+            self.topology = topology
+            if self.on_topology_change is not None:
+                self.on_topology_change()
+
+    async def async_set_zone(
+        self, serial: str, zone_id: int, zone_name: str, temp: float, is_off: bool = False
+    ) -> bool:
+        """Send a zone command, showing its result optimistically until the unit confirms it."""
+        self._apply_patch(serial, zone_id, {"SetTemp": int(temp * 10), "IsOFF": is_off})
+        try:
+            result = await self.commands.async_set_zone(serial, zone_id, zone_name, temp, is_off)
+        except ProAirError:
+            self._rollback_patch(serial, zone_id)
+            raise
+        self._command_done(serial, zone_id, temp, is_off, result)
+        return result
+
+    async def async_set_zones(
+        self, commands: list[tuple[str, int, str, float, bool]]
+    ) -> list[bool | ProAirError]:
+        """Send many (serial, zone_id, zone_name, temp, is_off) commands at once, bypassing the coalescing window.
+
+        They still go through the command queue, after the commands already queued or in
+        flight for their units, so an older setpoint can't land last.
+        """
+        for serial, zone_id, _, temp, is_off in commands:
+            self._apply_patch(serial, zone_id, {"SetTemp": int(temp * 10), "IsOFF": is_off})
+        results = await self.commands.async_send_now(
+            [ZoneUpdate(zone_id, zone_name, temp, is_off, serial) for serial, zone_id, zone_name, temp, is_off in commands],
+            self.max_concurrency,
+        )
+        for (serial, zone_id, _, temp, is_off), result in zip(commands, results):
+            self._command_done(serial, zone_id, temp, is_off, result)
+        return results
+
+    def _command_done(
+        self, serial: str, zone_id: int, temp: float, is_off: bool, result: bool | ProAirError
+    ) -> None:
+        """Track an accepted command until the unit confirms it, roll back its patch otherwise."""
+        if isinstance(result, ProAirError):
+            self._rollback_patch(serial, zone_id)
+            return
+        self.acks.track(serial, zone_id, {"target_temperature": scaled(int(temp * 10)), "is_off": is_off}, result)
+        if not result:
+            self._rollback_patch(serial, zone_id)
+        else:
+            if patch := self._patches.get((serial, zone_id)):
+                patch.sent = self.hass.loop.time()
+            self._async_notify_zone(serial, zone_id)
+
+    @callback
+    def _async_command_timed_out(self, ack: CommandAck) -> None:
+        """Show again what the unit reports for a zone that never applied its command."""
+        if (ack.serial, ack.zone_id) in self._patches:
+            self._rollback_patch(ack.serial, ack.zone_id)
+        else:
+            self._async_notify_zone(ack.serial, ack.zone_id)
+
+    async def _async_check_unit(self, serial: str) -> None:
+        """Fetch a single control unit to confirm its pending commands."""
+        started = self.hass.loop.time()
+        self.api.metrics.increment("command_checks")
+        unit = await self._async_fetch_unit(serial)
+        if self.data is None or serial not in self.data:
+            return
+        if unit:
+            unit["last_update"] = datetime.now().isoformat()
+        self._fetched[serial] = self.hass.loop.time()
+
+        zones = build_zone_index({serial: unit})
+        confirmed = self.acks.observe(zones, started)
+        for ack in confirmed:
+            self._patches.pop((ack.serial, ack.zone_id), None)
+        self._reconcile_patches(zones, started, {serial})
+
+        previous = [key for key in self.zones if key[0] == serial]
+        was_stale = serial in self._stale
+        self._changed_zones = {
+            key for key, zone in zones.items() if was_stale or self.zones.get(key) != zone
+        } | (set(previous) - zones.keys()) | {(ack.serial, ack.zone_id) for ack in confirmed}
+        self._changed_units = (
+            {serial} if was_stale or unit_values(self.data[serial]) != unit_values(unit) else set()
+        )
+        self._stale.discard(serial)
+        if self._changed_units or serial not in self.units:
+            self.units[serial] = UnitState(serial, unit)
+        for key in previous:
+            del self.zones[key]
+        self.zones.update(zones)
+        self.data = {**self.data, serial: unit}
+        self.async_update_listeners()
+
+    async def async_shutdown(self) -> None:
+        """Stop the command checks and schedules along with the scheduled refreshes."""
+        self.acks.cancel()
+        self.schedule.async_stop()
+        await super().async_shutdown()
+
+    def _set_next_interval(self, changed: bool = False, error: BaseException | None = None) -> None:
+        """Let the scheduler pick the interval used by the next scheduled refresh."""
+        retry_after = None
+        cause: BaseException | None = error
+        while cause is not None:
+            if isinstance(cause, ProAirServerError):
+                retry_after = cause.retry_after
+                break
+            cause = cause.__cause__
+        interval = self.scheduler.next_interval(
+            self.hass.loop.time(),
+            self.api.request_count,
+            max(1, len(self.api.serials)),
+            changed=changed,
+            error=error is not None,
+            retry_after=retry_after,
+        )
+        self.update_interval = timedelta(seconds=interval)
+
+    async def _async_fetch_unit(self, serial: str) -> dict[str, Any]:
+        """Fetch the state of a single control unit, bounded by the concurrency cap."""
+        async with self._semaphore:
+            return await self.api.get_state(serial)
+
+    async def _async_update_data(self) -> dict[str, dict[str, Any]]:
+        """Fetch data from API endpoint and schedule the next poll."""
+        first_refresh = self.data is None
+        start = time.perf_counter()
         try:
-            # Note: asyncio.timeout is preferred over async_timeout in newer HA versions, 
+            units = await self._async_fetch_units()
+        except Exception as err:
+            self.api.metrics.record_refresh(time.perf_counter() - start, False)
+            self._set_next_interval(error=err)
+            raise
+        self.api.metrics.record_refresh(time.perf_counter() - start, True)
+        self._set_next_interval(
+            changed=not first_refresh and self._control_changed_in_poll,
+            error=self._poll_error,
+        )
+        return units
+
+    def _auth_failed(self) -> None:
+        if self.on_auth_failed is not None:
+            self.on_auth_failed()
+
+    async def _async_fetch_units(self) -> dict[str, dict[str, Any]]:
+        """Fetch the state of every control unit."""
+        poll_started = self.hass.loop.time()
+        try:
+            if not self.api.serials or self.api.serials_expired:
+                await self.api.login()
+
+            # Note: asyncio.timeout is preferred over async_timeout in newer HA versions,
             # but async_timeout is safer for compatibility if we don't know the strictly required version.
             # However standard practice is keeping it simple.
             async with async_timeout.timeout(30):
-                data = await self.api.get_state()
-                if data:
-                    from datetime import datetime
-                    data["last_update"] = datetime.now().isoformat()
-                return data
+                results = await asyncio.gather(
+                    *(self._async_fetch_unit(serial) for serial in self.api.serials),
+                    return_exceptions=True,
+                )
         except ProAirAuthError as err:
+            self._auth_failed()
             raise ConfigEntryAuthFailed from err
-        except ProAirConnectionError as err:
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
+        except (ProAirConnectionError, asyncio.TimeoutError) as err:
+            if not self.api.serials:
+                raise UpdateFailed(f"Error communicating with API: {err}") from err
+            # Fall back to the cached state of every unit
+            results = [err] * len(self.api.serials)
+
+        last_update = datetime.now().isoformat()
+        now = self.hass.loop.time()
+        units: dict[str, dict[str, Any]] = {}
+        errors: list[BaseException] = []
+        stale: set[str] = set()
+        for serial, result in zip(self.api.serials, results):
+            if isinstance(result, ProAirAuthError):
+                self._auth_failed()
+                raise ConfigEntryAuthFailed from result
+            if isinstance(result, (ProAirConnectionError, asyncio.TimeoutError)):
+                _LOGGER.warning("Error fetching state of control unit %s: %s", serial, str(result) or "timeout")
+                errors.append(result)
+                # Keep serving the last known state of this unit while it is recent enough
+                fetched = self._fetched.get(serial)
+                if self.data and serial in self.data and fetched is not None and now - fetched <= self.stale_window:
+                    units[serial] = self.data[serial]
+                    stale.add(serial)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            if result:
+                result["last_update"] = last_update
+            units[serial] = result
+            self._fetched[serial] = now
+
+        self._poll_error = None
+        if errors and len(errors) == len(results):
+            if not units:
+                raise UpdateFailed(f"Error communicating with API: {str(errors[0]) or 'timeout'}") from errors[0]
+            _LOGGER.debug("Cloud unreachable, serving cached state of %s", sorted(units))
+            self._poll_error = errors[0]
+        zones = build_zone_index(units)
+        # Regular polls confirm pending commands as well
+        confirmed = self.acks.observe(
+            {key: zone for key, zone in zones.items() if key[0] not in stale} if stale else zones, poll_started
+        )
+        for ack in confirmed:
+            self._patches.pop((ack.serial, ack.zone_id), None)
+        self._reconcile_patches(zones, poll_started)
+        previous = self.data or {}
+        # Units entering or leaving the stale state, or dropping out, update all of their entities
+        toggled = (stale ^ self._stale) | (previous.keys() - units.keys())
+        self._changed_zones = {
+            key for key, zone in zones.items() if key[0] in toggled or self.zones.get(key) != zone
+        } | (self.zones.keys() - zones.keys()) | {(ack.serial, ack.zone_id) for ack in confirmed}
+        self._changed_units = toggled | {
+            serial for serial, unit in units.items()
+            if serial not in previous or unit_values(previous[serial]) != unit_values(unit)
+        }
+        self._stale = stale
+        previous_zones, previous_units = self.zones, self.units
+        self.zones = zones
+        self.units = {
+            serial: self.units[serial] if serial in self.units and serial not in self._changed_units
+            else UnitState(serial, unit)
+            for serial, unit in units.items()
+        }
+        self._control_changed_in_poll = _control_changed(previous_zones, zones, previous_units, self.units)
+        self._update_topology(units)
+        # Don't sample again the zones of units that kept their previous state
+        self.history.record(
+            time.time(), {key: zone for key, zone in zones.items() if key[0] not in stale} if stale else zones
+        )
+        return units
@@ -0,0 +1,46 @@
+"""Diagnostics support for ProAir Tecnosystemi."""
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD, CONF_DEVICE_ID
+from .coordinator import ProAirDataUpdateCoordinator
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, CONF_DEVICE_ID}
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry: request metrics, polling state and the last snapshot."""
+    coordinator: ProAirDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.api
+    now = hass.loop.time()
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "api": {
+            "serials": list(api.serials),
+            "request_count": api.request_count,
+            "logged_in": api.token is not None,
+            "consecutive_failures": api.consecutive_failures,
+            "circuit_open": api.circuit_open,
+        },
+        "polling": {
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "last_update_success": coordinator.last_update_success,
+            "fast_polling": coordinator.scheduler.is_active(now),
+            "request_budget": coordinator.scheduler.budget,
+            "max_concurrency": coordinator.max_concurrency,
+            "stale_window": coordinator.stale_window,
+            "units": {
+                serial: {"stale": coordinator.is_stale(serial), "age": coordinator.data_age(serial)}
+                for serial in api.serials
+            },
+        },
+        "metrics": api.metrics.as_dict(),
+        "topology": coordinator.topology,
+        "schedules": coordinator.schedule.export(),
+        "data": coordinator.data,
+    }
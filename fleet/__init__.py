@@ -0,0 +1,8 @@
+"""Headless poller watching many ProAir accounts without Home Assistant.
+
+Run it from the repository root, e.g. ``python -m fleet accounts.json``.
+Like the benchmarks, it loads the integration modules through ``standalone``.
+"""
+from standalone import register_package
+
+register_package()
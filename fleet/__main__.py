@@ -0,0 +1,79 @@
+"""Poll many ProAir accounts and stream the results.
+
+    python -m fleet accounts.json --format ndjson > samples.ndjson
+    python -m fleet accounts.json --format prometheus --port 9464
+
+The accounts file holds a JSON array, or one JSON object per line, with username,
+password, device_id and an optional name used as label.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+from proair_tecnosystemi.api import create_session
+from proair_tecnosystemi.const import API_BASE_URL, API_LOGIN_URL
+
+from .poller import FleetPoller, NdjsonWriter, PrometheusExporter, load_accounts
+
+
+async def run(args: argparse.Namespace) -> None:
+    accounts = load_accounts(args.accounts)
+    async with create_session(limit=args.concurrency) as session:
+        if args.format == "ndjson":
+            poller = FleetPoller(
+                session, accounts, NdjsonWriter(sys.stdout), args.interval, args.concurrency, args.rate,
+                args.base_url, args.login_url,
+            )
+            await (poller.poll_once() if args.once else poller.run())
+            return
+
+        exporter = PrometheusExporter()
+        poller = FleetPoller(
+            session, accounts, exporter, args.interval, args.concurrency, args.rate, args.base_url, args.login_url,
+        )
+        exporter.poller = poller
+        if args.once:
+            await poller.poll_once()
+            sys.stdout.write(exporter.render())
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", exporter.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        logging.getLogger(__name__).info("Serving metrics on http://%s:%s/metrics", args.host, args.port)
+        try:
+            await poller.run()
+        finally:
+            await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("accounts", type=Path, help="accounts file")
+    parser.add_argument("--format", choices=("ndjson", "prometheus"), default="ndjson")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls of an account")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight across all accounts")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second across all accounts (0 = unlimited)")
+    parser.add_argument("--once", action="store_true", help="poll every account once and exit")
+    parser.add_argument("--host", default="127.0.0.1", help="address of the Prometheus endpoint")
+    parser.add_argument("--port", type=int, default=9464, help="port of the Prometheus endpoint")
+    parser.add_argument("--base-url", default=API_BASE_URL, help=argparse.SUPPRESS)
+    parser.add_argument("--login-url", default=API_LOGIN_URL, help=argparse.SUPPRESS)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, stream=sys.stderr)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
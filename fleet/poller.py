@@ -0,0 +1,308 @@
+"""Poll the control units of many accounts under a global concurrency and rate limit."""
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+import aiohttp
+from aiohttp import web
+
+from proair_tecnosystemi.api import ProAirAPI, ProAirError
+from proair_tecnosystemi.const import API_BASE_URL, API_LOGIN_URL
+from proair_tecnosystemi.models import UnitState, ZoneState
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Account:
+    """Credentials of one cloud account, as listed in the accounts file."""
+
+    name: str
+    username: str
+    password: str
+    device_id: str
+
+
+def load_accounts(path: Path) -> list[Account]:
+    """Read a JSON array, or one JSON object per line, of username/password/device_id.
+
+    An optional "name" labels the account in the output instead of the username.
+    """
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    accounts = [
+        Account(entry.get("name") or entry["username"], entry["username"], entry["password"], entry["device_id"])
+        for entry in entries
+    ]
+    names = [account.name for account in accounts]
+    if duplicates := sorted({name for name in names if names.count(name) > 1}):
+        raise ValueError(f"Duplicate account names: {', '.join(duplicates)}")
+    return accounts
+
+
+class RateLimiter:
+    """Space out requests so that at most `rate` start per second, across all accounts."""
+
+    def __init__(self, rate: float) -> None:
+        self._spacing = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        if not self._spacing:
+            return
+        now = asyncio.get_running_loop().time()
+        start = max(self._next, now)
+        self._next = start + self._spacing
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class UnitSample:
+    """Outcome of one GetCUState poll, reduced to the values worth exporting."""
+
+    __slots__ = ("account", "serial", "time", "latency", "error", "unit", "zones")
+
+    def __init__(
+        self,
+        account: str,
+        serial: str,
+        latency: float,
+        payload: dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> None:
+        self.account = account
+        self.serial = serial
+        self.time = time.time()
+        self.latency = latency
+        self.error = error
+        self.unit: dict[str, Any] = {}
+        # (ZoneId, Name, temperature, target, humidity, is_off); the payload itself is not kept
+        self.zones: list[tuple[int, str, float | None, float | None, float | None, bool]] = []
+        if payload is not None:
+            unit = UnitState(serial, payload)
+            self.unit = {
+                "is_off": unit.is_off,
+                "is_cooling": unit.is_cooling,
+                "channel_temperature": unit.channel_temperature,
+                "firmware": unit.firmware,
+                "errors": len(unit.errors),
+            }
+            for zone in payload.get("Zones", []):
+                state = ZoneState(serial, zone)
+                self.zones.append(
+                    (state.zone_id, state.name, state.temperature, state.target_temperature, state.humidity, state.is_off)
+                )
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "time": round(self.time, 3),
+            "account": self.account,
+            "serial": self.serial,
+            "ok": self.ok,
+            "latency_ms": round(self.latency * 1000, 1),
+            "error": self.error,
+            **self.unit,
+            "zones": [
+                {"id": zone_id, "name": name, "temperature": temp, "target": target, "humidity": humidity, "is_off": is_off}
+                for zone_id, name, temp, target, humidity, is_off in self.zones
+            ],
+        }
+
+
+class FleetPoller:
+    """Poll every control unit of every account once per interval.
+
+    Requests of all accounts share `concurrency` slots and the rate limit. Each sample
+    is handed to `on_sample` as soon as it is fetched; nothing else is retained, so
+    memory only grows with the number of accounts.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        accounts: list[Account],
+        on_sample: Callable[[UnitSample], None],
+        interval: float = 60.0,
+        concurrency: int = 32,
+        rate: float = 10.0,
+        base_url: str = API_BASE_URL,
+        login_url: str = API_LOGIN_URL,
+    ) -> None:
+        self.apis = {
+            account.name: ProAirAPI(
+                session, account.username, account.password, account.device_id, base_url, login_url
+            )
+            for account in accounts
+        }
+        self.on_sample = on_sample
+        self.interval = interval
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._limiter = RateLimiter(rate)
+
+    async def _login(self, name: str, api: ProAirAPI) -> bool:
+        async with self._semaphore:
+            await self._limiter.acquire()
+            try:
+                await api.login()
+            except ProAirError as err:
+                _LOGGER.warning("Login of %s failed: %s", name, err)
+                return False
+            return True
+
+    async def _poll_unit(self, name: str, api: ProAirAPI, serial: str) -> None:
+        async with self._semaphore:
+            await self._limiter.acquire()
+            start = time.perf_counter()
+            try:
+                payload = await api.get_state(serial)
+            except ProAirError as err:
+                sample = UnitSample(name, serial, time.perf_counter() - start, error=str(err) or type(err).__name__)
+            else:
+                sample = UnitSample(name, serial, time.perf_counter() - start, payload)
+        self.on_sample(sample)
+
+    async def poll_account(self, name: str) -> None:
+        """Poll every unit of one account, logging in first if needed."""
+        api = self.apis[name]
+        if not api.serials and not await self._login(name, api):
+            return
+        await asyncio.gather(*(self._poll_unit(name, api, serial) for serial in api.serials))
+
+    async def poll_once(self) -> None:
+        await asyncio.gather(*(self.poll_account(name) for name in self.apis))
+
+    async def run(self) -> None:
+        """Poll forever, each account on its own schedule so their requests spread out."""
+
+        async def account_loop(name: str, offset: float) -> None:
+            await asyncio.sleep(offset)
+            loop = asyncio.get_running_loop()
+            while True:
+                started = loop.time()
+                await self.poll_account(name)
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+        count = len(self.apis)
+        await asyncio.gather(
+            *(account_loop(name, self.interval * index / count) for index, name in enumerate(self.apis))
+        )
+
+
+class NdjsonWriter:
+    """Write every sample as one JSON line."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+
+    def __call__(self, sample: UnitSample) -> None:
+        self._stream.write(json.dumps(sample.as_dict(), separators=(",", ":")) + "\n")
+        self._stream.flush()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class PrometheusExporter:
+    """Keep the latest sample of each unit and render them in the Prometheus text format."""
+
+    def __init__(self, poller: FleetPoller | None = None) -> None:
+        self.poller = poller
+        self.samples: dict[tuple[str, str], UnitSample] = {}
+
+    def __call__(self, sample: UnitSample) -> None:
+        previous = self.samples.get((sample.account, sample.serial))
+        if not sample.ok and previous is not None and previous.ok:
+            # Keep the last known values, only flag the unit as down
+            previous.error = sample.error
+            previous.latency = sample.latency
+            return
+        self.samples[(sample.account, sample.serial)] = sample
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str, rows: list[tuple[dict[str, Any], float | None]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in rows:
+                if value is not None:
+                    lines.append(f"{name}{_labels(**labels)} {value}")
+
+        samples = list(self.samples.values())
+        unit = [(sample, {"account": sample.account, "serial": sample.serial}) for sample in samples]
+        metric("proair_unit_up", "gauge", "Whether the last poll of the control unit succeeded.",
+               [(labels, int(sample.ok)) for sample, labels in unit])
+        metric("proair_unit_last_poll_timestamp_seconds", "gauge", "Time of the last poll.",
+               [(labels, round(sample.time, 3)) for sample, labels in unit])
+        metric("proair_unit_poll_latency_seconds", "gauge", "Duration of the last poll.",
+               [(labels, round(sample.latency, 4)) for sample, labels in unit])
+        metric("proair_unit_off", "gauge", "Whether the control unit is switched off.",
+               [(labels, int(sample.unit["is_off"])) for sample, labels in unit if sample.unit])
+        metric("proair_unit_channel_temperature_celsius", "gauge", "Temperature of the air channel.",
+               [(labels, sample.unit["channel_temperature"]) for sample, labels in unit if sample.unit])
+        metric("proair_unit_errors", "gauge", "Errors reported by the control unit.",
+               [(labels, sample.unit["errors"]) for sample, labels in unit if sample.unit])
+
+        zones = [
+            ({"account": sample.account, "serial": sample.serial, "zone": zone[0], "name": zone[1]}, zone)
+            for sample in samples
+            for zone in sample.zones
+        ]
+        metric("proair_zone_temperature_celsius", "gauge", "Measured zone temperature.",
+               [(labels, zone[2]) for labels, zone in zones])
+        metric("proair_zone_target_temperature_celsius", "gauge", "Target zone temperature.",
+               [(labels, zone[3]) for labels, zone in zones])
+        metric("proair_zone_humidity_percent", "gauge", "Measured zone humidity.",
+               [(labels, zone[4]) for labels, zone in zones])
+        metric("proair_zone_on", "gauge", "Whether the zone is switched on.",
+               [(labels, int(not zone[5])) for labels, zone in zones])
+
+        if self.poller is not None:
+            self._render_requests(lines)
+        return "\n".join(lines) + "\n"
+
+    def _render_requests(self, lines: list[str]) -> None:
+        """Request counters and latency histograms of every account."""
+        assert self.poller is not None
+        lines.append("# HELP proair_requests_total Requests sent to the cloud, by endpoint and outcome.")
+        lines.append("# TYPE proair_requests_total counter")
+        for name, api in self.poller.apis.items():
+            for endpoint, stats in api.metrics.endpoints.items():
+                for outcome, count in stats.outcomes.items():
+                    lines.append(f"proair_requests_total{_labels(account=name, endpoint=endpoint, outcome=outcome)} {count}")
+
+        lines.append("# HELP proair_request_duration_seconds Duration of requests to the cloud.")
+        lines.append("# TYPE proair_request_duration_seconds histogram")
+        for name, api in self.poller.apis.items():
+            for endpoint, stats in api.metrics.endpoints.items():
+                histogram = stats.latency
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    labels = _labels(account=name, endpoint=endpoint, le=f"{bound:g}")
+                    lines.append(f"proair_request_duration_seconds_bucket{labels} {cumulative}")
+                labels = _labels(account=name, endpoint=endpoint, le="+Inf")
+                lines.append(f"proair_request_duration_seconds_bucket{labels} {histogram.count}")
+                labels = _labels(account=name, endpoint=endpoint)
+                lines.append(f"proair_request_duration_seconds_sum{labels} {histogram.total:.6f}")
+                lines.append(f"proair_request_duration_seconds_count{labels} {histogram.count}")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
@@ -0,0 +1,262 @@
+import base64
+import math
+import sys
+from array import array
+from collections.abc import Callable, Iterator, Mapping
+from datetime import datetime, timezone
+from typing import Any
+
+from .const import HISTORY_BUCKET, HISTORY_BUCKETS
+from .models import ZoneState
+
+NAN = float("nan")
+# Values kept per closed bucket, in this order
+FIELDS = (
+    "temperature",
+    "temperature_min",
+    "temperature_max",
+    "target_temperature",
+    "humidity",
+    "on_ratio",
+    "samples",
+)
+_WIDTH = len(FIELDS)
+
+class _OpenBucket:
+    """Running sums of the bucket being filled."""
+
+    __slots__ = (
+        "start", "samples", "temp_sum", "temp_samples", "temp_min", "temp_max",
+        "target_sum", "target_samples", "humidity_sum", "humidity_samples", "on_samples",
+    )
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.samples = 0
+        self.temp_sum = 0.0
+        self.temp_samples = 0
+        self.temp_min = math.inf
+        self.temp_max = -math.inf
+        self.target_sum = 0.0
+        self.target_samples = 0
+        self.humidity_sum = 0.0
+        self.humidity_samples = 0
+        self.on_samples = 0
+
+    def add(self, zone: ZoneState) -> None:
+        self.samples += 1
+        if (temp := zone.temperature) is not None:
+            self.temp_sum += temp
+            self.temp_samples += 1
+            self.temp_min = min(self.temp_min, temp)
+            self.temp_max = max(self.temp_max, temp)
+        if (target := zone.target_temperature) is not None:
+            self.target_sum += target
+            self.target_samples += 1
+        if (humidity := zone.humidity) is not None:
+            self.humidity_sum += humidity
+            self.humidity_samples += 1
+        if not zone.is_off:
+            self.on_samples += 1
+
+    def values(self) -> tuple[float, ...]:
+        """Aggregates in FIELDS order, NaN when nothing was sampled."""
+        has_temp = self.temp_samples > 0
+        return (
+            self.temp_sum / self.temp_samples if has_temp else NAN,
+            self.temp_min if has_temp else NAN,
+            self.temp_max if has_temp else NAN,
+            self.target_sum / self.target_samples if self.target_samples else NAN,
+            self.humidity_sum / self.humidity_samples if self.humidity_samples else NAN,
+            self.on_samples / self.samples if self.samples else NAN,
+            float(self.samples),
+        )
+
+class ZoneHistory:
+    """Fixed-size ring buffer of the closed buckets of a zone, plus the open one.
+
+    Closed buckets live in flat arrays (float32 values, int64 start times), so a week
+    of 5-minute buckets costs about 72 KiB per zone whatever the polling rate.
+    """
+
+    __slots__ = ("size", "_starts", "_values", "_next", "_count", "_open")
+
+    def __init__(self, size: int = HISTORY_BUCKETS) -> None:
+        self.size = size
+        self._starts = array("q", bytes(8 * size))
+        self._values = array("f", [NAN]) * (size * _WIDTH)
+        self._next = 0
+        self._count = 0
+        self._open: _OpenBucket | None = None
+
+    def add(self, start: int, zone: ZoneState) -> None:
+        """Add a sample to the bucket starting at `start`, closing the previous one."""
+        if self._open is not None and self._open.start != start:
+            self._close()
+        if self._open is None:
+            self._open = _OpenBucket(start)
+        self._open.add(zone)
+
+    def _close(self) -> None:
+        bucket = self._open
+        self._open = None
+        if bucket is None or not bucket.samples:
+            return
+        index = self._next
+        self._starts[index] = bucket.start
+        self._values[index * _WIDTH:(index + 1) * _WIDTH] = array("f", bucket.values())
+        self._next = (index + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def rows(self, since: float = 0) -> Iterator[tuple[int, tuple[float, ...]]]:
+        """Yield (bucket start, values) oldest first, the open bucket last."""
+        first = (self._next - self._count) % self.size
+        for offset in range(self._count):
+            index = (first + offset) % self.size
+            start = self._starts[index]
+            if start >= since:
+                yield start, tuple(self._values[index * _WIDTH:(index + 1) * _WIDTH])
+        if self._open is not None and self._open.samples and self._open.start >= since:
+            yield self._open.start, self._open.values()
+
+    def export(self, since: int = 0, until: int | None = None) -> dict[str, Any]:
+        """Closed buckets starting in [since, until), oldest first, as base64 of the raw arrays."""
+        starts = array("q")
+        values = array("f")
+        first = (self._next - self._count) % self.size
+        for offset in range(self._count):
+            index = (first + offset) % self.size
+            start = self._starts[index]
+            if start < since or (until is not None and start >= until):
+                continue
+            starts.append(start)
+            values.extend(self._values[index * _WIDTH:(index + 1) * _WIDTH])
+        return {
+            "starts": base64.b64encode(starts.tobytes()).decode(),
+            "values": base64.b64encode(values.tobytes()).decode(),
+        }
+
+    def restore(self, data: Mapping[str, Any], byteorder: str, since: int = 0) -> None:
+        """Append buckets saved by export starting at `since` or later, keeping the newest ones if the buffer shrank."""
+        starts = array("q", base64.b64decode(data["starts"]))
+        values = array("f", base64.b64decode(data["values"]))
+        if byteorder != sys.byteorder:
+            starts.byteswap()
+            values.byteswap()
+        positions = [position for position in range(min(len(starts), len(values) // _WIDTH)) if starts[position] >= since]
+        for position in positions[-self.size:]:
+            index = self._next
+            self._starts[index] = starts[position]
+            self._values[index * _WIDTH:(index + 1) * _WIDTH] = values[position * _WIDTH:(position + 1) * _WIDTH]
+            self._next = (index + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+def _merge(rows: list[tuple[float, ...]]) -> tuple[float, ...]:
+    """Combine consecutive buckets, weighting the means by their samples."""
+    if len(rows) == 1:
+        return rows[0]
+
+    def weighted(field: int) -> float:
+        total = weight = 0.0
+        for row in rows:
+            if not math.isnan(row[field]):
+                total += row[field] * row[6]
+                weight += row[6]
+        return total / weight if weight else NAN
+
+    def extreme(field: int, func: Callable[..., float]) -> float:
+        values = [row[field] for row in rows if not math.isnan(row[field])]
+        return func(values) if values else NAN
+
+    return (
+        weighted(0),
+        extreme(1, min),
+        extreme(2, max),
+        weighted(3),
+        weighted(4),
+        weighted(5),
+        sum(row[6] for row in rows),
+    )
+
+def _row_dict(start: int, width: int, values: tuple[float, ...]) -> dict[str, Any]:
+    row: dict[str, Any] = {
+        "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(start + width, timezone.utc).isoformat(),
+    }
+    for field, value in zip(FIELDS, values):
+        row[field] = None if math.isnan(value) else round(value, 2)
+    row["samples"] = int(values[6])
+    return row
+
+class ProAirHistory:
+    """Downsampled history of every zone, sampled on each successful poll."""
+
+    def __init__(self, bucket: int = HISTORY_BUCKET, size: int = HISTORY_BUCKETS) -> None:
+        self.bucket = bucket
+        self.size = size
+        self.zones: dict[tuple[str, int], ZoneHistory] = {}
+        # Called after new samples are recorded, so the history can be persisted
+        self.on_change: Callable[[], None] | None = None
+
+    def record(self, now: float, zones: Mapping[tuple[str, int], ZoneState]) -> None:
+        """Add one sample per zone at wall clock time `now`."""
+        start = int(now // self.bucket * self.bucket)
+        for key, zone in zones.items():
+            history = self.zones.get(key)
+            if history is None:
+                history = self.zones[key] = ZoneHistory(self.size)
+            history.add(start, zone)
+        if self.on_change is not None:
+            self.on_change()
+
+    def query(self, serial: str, zone_id: int, since: float, resolution: int | None = None) -> list[dict[str, Any]]:
+        """Return the buckets of a zone newer than `since`.
+
+        `resolution` is rounded up to a multiple of the bucket width; wider buckets
+        are merged from the stored ones.
+        """
+        history = self.zones.get((serial, zone_id))
+        if history is None:
+            return []
+        width = max(1, math.ceil((resolution or self.bucket) / self.bucket)) * self.bucket
+        since = since // width * width
+        result: list[dict[str, Any]] = []
+        group_start: int | None = None
+        group: list[tuple[float, ...]] = []
+        for start, values in history.rows(since):
+            bucket_start = start // width * width
+            if group and bucket_start != group_start:
+                result.append(_row_dict(group_start, width, _merge(group)))
+                group = []
+            group_start = bucket_start
+            group.append(values)
+        if group:
+            result.append(_row_dict(group_start, width, _merge(group)))
+        return result
+
+    def export(self, since: int = 0, until: int | None = None) -> dict[str, Any]:
+        """Closed buckets of every zone starting in [since, until), for storage."""
+        return {
+            "bucket": self.bucket,
+            "byteorder": sys.byteorder,
+            "zones": {
+                f"{serial}/{zone_id}": history.export(since, until)
+                for (serial, zone_id), history in self.zones.items()
+            },
+        }
+
+    def restore(self, data: Mapping[str, Any], since: int = 0) -> bool:
+        """Add the buckets of a history saved by export, starting at `since` or later.
+
+        Several exports covering consecutive periods are restored oldest first.
+        Ignored if the bucket width changed.
+        """
+        if data.get("bucket") != self.bucket:
+            return False
+        for key, zone_data in data.get("zones", {}).items():
+            serial, _, zone_id = key.rpartition("/")
+            history = self.zones.get((serial, int(zone_id)))
+            if history is None:
+                history = self.zones[(serial, int(zone_id))] = ZoneHistory(self.size)
+            history.restore(zone_data, data.get("byteorder", sys.byteorder), since)
+        return True
@@ -0,0 +1,146 @@
+import bisect
+from typing import Any
+
+# Upper bounds in seconds of the latency buckets; the last bucket is open ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Token encryption and decryption take microseconds
+CRYPTO_BUCKETS = (0.00001, 0.00002, 0.00005, 0.0001, 0.0005, 0.001)
+
+# Outcome of a single HTTP exchange
+OUTCOME_OK = "ok"
+OUTCOME_UNAUTHORIZED = "unauthorized"
+OUTCOME_HTTP_ERROR = "http_error"
+OUTCOME_SERVER_ERROR = "server_error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CONNECTION_ERROR = "connection_error"
+OUTCOME_INVALID_RESPONSE = "invalid_response"
+# The caller gave up, e.g. the refresh timed out
+OUTCOME_CANCELLED = "cancelled"
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    __slots__ = ("buckets", "counts", "count", "total", "max", "last")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last: float | None = None
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction: float) -> float | None:
+        """Upper bound of the bucket holding the given quantile (the max for the open bucket)."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max if self.count else None,
+            "last": self.last,
+            "buckets": {
+                **{f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+class EndpointStats:
+    """Latency and outcome counters of one cloud endpoint."""
+
+    __slots__ = ("latency", "outcomes")
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.outcomes: dict[str, int] = {}
+
+    @property
+    def requests(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def failures(self) -> int:
+        return self.requests - self.outcomes.get(OUTCOME_OK, 0)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"requests": self.requests, "outcomes": dict(self.outcomes), "latency": self.latency.as_dict()}
+
+class ProAirMetrics:
+    """In-memory counters and latency histograms of a ProAirAPI and its coordinator.
+
+    Endpoints are keyed by the last path segment of their URL (Login, GetCUState, ...).
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = {}
+        # Retries, re-logins after a 401, circuit breaker rejections, ...
+        self.counters: dict[str, int] = {}
+        self.crypto = LatencyHistogram(CRYPTO_BUCKETS)
+        self.refresh = LatencyHistogram()
+        self.refresh_failures = 0
+
+    def record_request(self, endpoint: str, outcome: str, seconds: float) -> None:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.latency.observe(seconds)
+        stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+
+    def increment(self, counter: str) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + 1
+
+    def record_refresh(self, seconds: float, success: bool) -> None:
+        self.refresh.observe(seconds)
+        if not success:
+            self.refresh_failures += 1
+
+    @property
+    def requests(self) -> int:
+        return sum(stats.requests for stats in self.endpoints.values())
+
+    @property
+    def failures(self) -> int:
+        return sum(stats.failures for stats in self.endpoints.values())
+
+    def failures_by_class(self) -> dict[str, int]:
+        """Failed exchanges of every endpoint, summed per outcome."""
+        failures: dict[str, int] = {}
+        for stats in self.endpoints.values():
+            for outcome, count in stats.outcomes.items():
+                if outcome != OUTCOME_OK:
+                    failures[outcome] = failures.get(outcome, 0) + count
+        return failures
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "failures_by_class": self.failures_by_class(),
+            "counters": dict(self.counters),
+            "endpoints": {name: stats.as_dict() for name, stats in self.endpoints.items()},
+            "token_crypto": self.crypto.as_dict(),
+            "refresh": {**self.refresh.as_dict(), "failures": self.refresh_failures},
+        }
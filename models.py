@@ -0,0 +1,93 @@
+from typing import Any
+
+def scaled(value: Any) -> float | None:
+    """Convert a value reported in tenths (e.g. 215) to its unit (21.5)."""
+    if value is None:
+        return None
+    if type(value) is int:
+        return value / 10
+    try:
+        return float(value) / 10
+    except (ValueError, TypeError):
+        return None
+
+class ZoneState:
+    """Parsed state of a zone, built once per refresh and shared by all platforms."""
+
+    __slots__ = ("serial", "zone_id", "name", "temperature", "target_temperature", "humidity", "is_off", "raw")
+
+    def __init__(self, serial: str, zone: dict[str, Any]) -> None:
+        self.serial = serial
+        self.zone_id: int = zone["ZoneId"]
+        self.name: str = zone.get("Name", "")
+        self.temperature = scaled(zone.get("Temp"))
+        self.target_temperature = scaled(zone.get("SetTemp"))
+        self.humidity = scaled(zone.get("Umd"))
+        # IsOFF nel JSON è booleano
+        self.is_off = zone.get("IsOFF") is True
+        self.raw = zone
+
+    def __eq__(self, other: object) -> bool:
+        """Zones are equal when every value an entity shows is the same."""
+        if not isinstance(other, ZoneState):
+            return NotImplemented
+        return (
+            self.serial == other.serial
+            and self.zone_id == other.zone_id
+            and self.name == other.name
+            and self.temperature == other.temperature
+            and self.target_temperature == other.target_temperature
+            and self.humidity == other.humidity
+            and self.is_off == other.is_off
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+class UnitState:
+    """Parsed unit-level values of a control unit, built once per snapshot of that unit."""
+
+    __slots__ = (
+        "serial", "firmware", "errors", "is_off", "is_cooling", "mode", "channel_temperature", "attributes",
+    )
+
+    def __init__(self, serial: str, unit: dict[str, Any]) -> None:
+        self.serial = serial
+        self.firmware: str | None = unit.get("FWVer")
+        self.errors: list[Any] = list(unit.get("Errors") or [])
+        self.is_off = bool(unit.get("IsOFF"))
+        self.is_cooling = bool(unit.get("IsCooling"))
+        self.mode = "system_off" if self.is_off else "cooling" if self.is_cooling else "heating"
+        self.channel_temperature = scaled(unit.get("TempCan"))
+        # Attributes of the system status sensor, as reported by the unit
+        self.attributes: dict[str, Any] = {
+            "serial_number": unit.get("Serial"),
+            "firmware_version": self.firmware,
+            "errors": unit.get("Errors"),
+            "system_off": unit.get("IsOFF"),
+            "is_cooling": unit.get("IsCooling"),
+            "operating_mode": unit.get("OperatingModeCooling"),
+        }
+        if unit.get("TempCan") is not None:
+            self.attributes["channel_temperature"] = self.channel_temperature
+
+def unit_values(unit: dict[str, Any]) -> dict[str, Any]:
+    """Unit-level values of a GetCUState payload, without zones and local metadata."""
+    return {key: value for key, value in unit.items() if key not in ("Zones", "last_update")}
+
+def build_zone_index(units: dict[str, dict[str, Any]]) -> dict[tuple[str, int], ZoneState]:
+    """Index every zone of every control unit by (serial, ZoneId)."""
+    return {
+        (serial, zone["ZoneId"]): ZoneState(serial, zone)
+        for serial, unit in units.items()
+        for zone in unit.get("Zones", [])
+    }
+
+def build_topology(units: dict[str, dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    """Zone layout of every control unit: what is needed to create the entities."""
+    return {
+        serial: [
+            {"ZoneId": zone["ZoneId"], "Name": zone.get("Name"), "HasHumidity": zone.get("Umd") is not None}
+            for zone in unit.get("Zones", [])
+        ]
+        for serial, unit in units.items()
+    }
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import datetime, time, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .api import ProAirError
+from .models import scaled
+
+if TYPE_CHECKING:
+    from .coordinator import ProAirDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Setpoint of a slot: a target temperature, or None to switch the zone off
+Setpoint = float | None
+
+class WeeklySchedule:
+    """Setpoints of a zone for each day of the week, from the given time until the next slot."""
+
+    __slots__ = ("_days",)
+
+    def __init__(self, slots: list[dict[str, Any]]) -> None:
+        # weekday -> [(time, setpoint)], sorted by time
+        self._days: list[list[tuple[time, Setpoint]]] = [[] for _ in WEEKDAYS]
+        for slot in slots:
+            at = slot["at"] if isinstance(slot["at"], time) else time.fromisoformat(slot["at"])
+            setpoint = slot.get("temperature")
+            for day in slot["days"]:
+                self._days[WEEKDAYS.index(day)].append((at.replace(second=0, microsecond=0), setpoint))
+        for day in self._days:
+            day.sort(key=lambda item: item[0])
+
+    def __bool__(self) -> bool:
+        return any(self._days)
+
+    def next_change(self, after: datetime) -> tuple[datetime, Setpoint] | None:
+        """Return the first transition strictly after `after`, in its time zone."""
+        for offset in range(8):
+            date = after.date() + timedelta(days=offset)
+            for at, setpoint in self._days[date.weekday()]:
+                when = datetime.combine(date, at, after.tzinfo)
+                if when > after:
+                    return when, setpoint
+        return None
+
+    def as_slots(self) -> list[dict[str, Any]]:
+        """Slots in storage form, one per time and setpoint with the days sharing them."""
+        slots: dict[tuple[time, Setpoint], list[str]] = {}
+        for name, day in zip(WEEKDAYS, self._days):
+            for at, setpoint in day:
+                slots.setdefault((at, setpoint), []).append(name)
+        return [
+            {"days": days, "at": at.strftime("%H:%M"), "temperature": setpoint}
+            for (at, setpoint), days in sorted(slots.items(), key=lambda item: item[0][0])
+        ]
+
+class ProAirScheduleEngine:
+    """Apply the weekly schedules of the zones of an account.
+
+    Only the next transition of every zone is kept, and a single timer waits for the
+    earliest one. When it fires, the setpoints due are compared with the zones' current
+    state and only the zones that differ are sent, in one batch per control unit.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: "ProAirDataUpdateCoordinator") -> None:
+        self.hass = hass
+        self.coordinator = coordinator
+        self.schedules: dict[tuple[str, int], WeeklySchedule] = {}
+        # Called when schedules are added or removed, e.g. to save them
+        self.on_change: Callable[[], None] | None = None
+        # (serial, ZoneId) -> next transition
+        self._upcoming: dict[tuple[str, int], tuple[datetime, Setpoint]] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+        self._timer_at: datetime | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def load(self, data: dict[str, list[dict[str, Any]]]) -> None:
+        """Restore schedules saved by `export`."""
+        for key, slots in data.items():
+            serial, _, zone_id = key.rpartition(":")
+            if schedule := WeeklySchedule(slots):
+                self.schedules[(serial, int(zone_id))] = schedule
+
+    def export(self) -> dict[str, list[dict[str, Any]]]:
+        return {f"{serial}:{zone_id}": schedule.as_slots() for (serial, zone_id), schedule in self.schedules.items()}
+
+    def next_change(self, serial: str, zone_id: int) -> tuple[datetime, Setpoint] | None:
+        """Return the next scheduled transition of a zone."""
+        return self._upcoming.get((serial, zone_id))
+
+    @callback
+    def async_set(self, serial: str, zone_id: int, schedule: WeeklySchedule | None) -> None:
+        """Replace the schedule of a zone; None or an empty schedule removes it."""
+        key = (serial, zone_id)
+        if schedule:
+            self.schedules[key] = schedule
+        else:
+            self.schedules.pop(key, None)
+        self._plan([key], dt_util.now())
+        if self.on_change is not None:
+            self.on_change()
+
+    @callback
+    def async_start(self) -> None:
+        """Plan the next transition of every zone."""
+        self._plan(list(self.schedules), dt_util.now())
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = self._timer_at = None
+        for task in self._tasks:
+            task.cancel()
+
+    @callback
+    def _plan(self, keys: list[tuple[str, int]], now: datetime) -> None:
+        """Recompute the next transition of `keys` and arm the timer for the earliest one."""
+        for key in keys:
+            schedule = self.schedules.get(key)
+            change = schedule.next_change(now) if schedule is not None else None
+            if change is None:
+                self._upcoming.pop(key, None)
+            else:
+                self._upcoming[key] = change
+
+        earliest = min((when for when, _ in self._upcoming.values()), default=None)
+        if earliest == self._timer_at:
+            return
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._timer_at = earliest
+        if earliest is not None:
+            self._unsub = async_track_point_in_time(self.hass, self._async_fire, earliest)
+
+    @callback
+    def _async_fire(self, now: datetime) -> None:
+        """Send the transitions that are due and plan the following ones."""
+        self._unsub = self._timer_at = None
+        due = {key: setpoint for key, (when, setpoint) in self._upcoming.items() if when <= now}
+        # Plan from the transition time, in case the timer fired a little early
+        self._plan(list(due), max(now, max((self._upcoming[key][0] for key in due), default=now)))
+        if due:
+            # Show the following transition even where nothing has to be sent
+            self.coordinator.async_notify_zones(due)
+            task = self.hass.async_create_background_task(self.async_apply(due), "proair schedule")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def async_apply(self, setpoints: dict[tuple[str, int], Setpoint]) -> int:
+        """Send the setpoints that differ from the zones' current state; return how many were sent."""
+        batches: dict[str, list[tuple[str, int, str, float, bool]]] = {}
+        for (serial, zone_id), setpoint in setpoints.items():
+            zone = self.coordinator.get_zone(serial, zone_id)
+            if zone is None:
+                _LOGGER.debug("Skipping scheduled setpoint of unknown zone %s of %s", zone_id, serial)
+                continue
+            if setpoint is None:
+                if zone.is_off or zone.target_temperature is None:
+                    continue
+                command = (serial, zone_id, zone.name, zone.target_temperature, True)
+            else:
+                # Compare in the tenths the command sends, as parsed from the unit's state
+                if not zone.is_off and zone.target_temperature == scaled(int(setpoint * 10)):
+                    continue
+                command = (serial, zone_id, zone.name, setpoint, False)
+            batches.setdefault(serial, []).append(command)
+
+        if not batches:
+            return 0
+        _LOGGER.debug(
+            "Scheduled changes: %s",
+            {serial: [command[1] for command in batch] for serial, batch in batches.items()},
+        )
+        results = await asyncio.gather(
+            *(self.coordinator.async_set_zones(batch) for batch in batches.values())
+        )
+        for batch, batch_results in zip(batches.values(), results):
+            for (serial, zone_id, *_), result in zip(batch, batch_results):
+                if isinstance(result, ProAirError) or not result:
+                    _LOGGER.warning("Scheduled setpoint of zone %s of %s failed: %s", zone_id, serial, result)
+        return sum(len(batch) for batch in batches.values())
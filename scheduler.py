@@ -0,0 +1,95 @@
+from collections import deque
+
+from .const import (
+    ACTIVITY_WINDOW,
+    DEFAULT_REQUEST_BUDGET,
+    FAST_UPDATE_INTERVAL,
+    MAX_UPDATE_INTERVAL,
+    STABLE_POLLS_BEFORE_BACKOFF,
+    UPDATE_INTERVAL,
+)
+
+BUDGET_WINDOW = 3600
+
+class ProAirPollScheduler:
+    """Pick the delay before the next poll from activity, errors and the request budget.
+
+    Times are monotonic seconds supplied by the caller, so the scheduler holds no clock.
+    """
+
+    def __init__(
+        self,
+        budget: int = DEFAULT_REQUEST_BUDGET,
+        base_interval: float = UPDATE_INTERVAL,
+        fast_interval: float = FAST_UPDATE_INTERVAL,
+        max_interval: float = MAX_UPDATE_INTERVAL,
+        activity_window: float = ACTIVITY_WINDOW,
+    ) -> None:
+        self.budget = budget
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.activity_window = activity_window
+        self._active_until = 0.0
+        self._stable_polls = 0
+        self._errors = 0
+        # (time, request counter) samples covering the last budget window
+        self._samples: deque[tuple[float, int]] = deque()
+
+    def note_activity(self, now: float) -> None:
+        """A command was sent or a change detected: poll fast for a while."""
+        self._active_until = now + self.activity_window
+        self._stable_polls = 0
+
+    def is_active(self, now: float) -> bool:
+        """Return whether the fast polling window is open."""
+        return now < self._active_until
+
+    def record_requests(self, now: float, request_count: int) -> None:
+        """Record the account's request counter, dropping samples out of the budget window."""
+        self._samples.append((now, request_count))
+        while len(self._samples) > 1 and self._samples[1][0] <= now - BUDGET_WINDOW:
+            self._samples.popleft()
+
+    def _budget_delay(self, now: float, request_count: int, poll_cost: int) -> float:
+        """Shortest delay that keeps polls within the hourly request budget."""
+        if self.budget <= 0 or not self._samples:
+            return 0.0
+        # Steady pacing: spread the budget evenly over the window
+        delay = BUDGET_WINDOW * poll_cost / self.budget
+        start, start_count = self._samples[0]
+        if request_count - start_count + poll_cost > self.budget:
+            # Spent already: wait until the oldest sample leaves the window
+            delay = max(delay, start + BUDGET_WINDOW - now)
+        return delay
+
+    def next_interval(
+        self,
+        now: float,
+        request_count: int,
+        poll_cost: int,
+        changed: bool = False,
+        error: bool = False,
+        retry_after: float | None = None,
+    ) -> float:
+        """Return the delay in seconds before the next poll, given the outcome of the last one."""
+        self.record_requests(now, request_count)
+        if error:
+            self._errors += 1
+            interval = min(self.max_interval, self.base_interval * 2 ** (self._errors - 1))
+            if retry_after is not None:
+                interval = max(interval, retry_after)
+        else:
+            self._errors = 0
+            if changed:
+                self.note_activity(now)
+            else:
+                self._stable_polls += 1
+
+            if self.is_active(now):
+                interval = self.fast_interval
+            else:
+                backoff = max(0, self._stable_polls - STABLE_POLLS_BEFORE_BACKOFF)
+                interval = min(self.max_interval, self.base_interval * 2 ** min(backoff, 16))
+
+        return max(interval, self._budget_delay(now, request_count, poll_cost))
@@ -5,13 +5,14 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorStateClass,
 )
-from homeassistant.const import PERCENTAGE
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTemperature, UnitOfTime
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .coordinator import ProAirDataUpdateCoordinator
 from .const import DOMAIN
+from .metrics import LatencyHistogram, ProAirMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,18 +20,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     """Set up the ProAir sensor platform."""
     coordinator: ProAirDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     
-    if coordinator.data and "Zones" in coordinator.data:
-        sensors = []
-        for zone in coordinator.data["Zones"]:
+    sensors = []
+    # Entities come from the zone layout, the first refresh may still be running
+    for serial, zones in coordinator.topology.items():
+        for zone in zones:
             # Check if humidity data is available (some older zones might not have it)
-            if zone.get("Umd") is not None:
-                sensors.append(ProAirHumiditySensor(coordinator, zone))
-        
-        # Add System Status Sensor
-        sensors.append(ProAirSystemStatusSensor(coordinator))
-
-        if sensors:
-            async_add_entities(sensors, True)
+            if zone.get("HasHumidity"):
+                sensors.append(ProAirHumiditySensor(coordinator, serial, zone))
+
+        # Add System Status Sensor, one per control unit
+        sensors.append(ProAirSystemStatusSensor(coordinator, serial))
+        sensors.extend(ProAirUnitSensor(coordinator, serial, key) for key in UNIT_SENSORS)
+
+    # Cloud request diagnostics, one set per account
+    if coordinator.api.serial:
+        sensors.extend(ProAirDiagnosticSensor(coordinator, key) for key in DIAGNOSTIC_SENSORS)
+
+    if sensors:
+        async_add_entities(sensors)
     
 class ProAirHumiditySensor(CoordinatorEntity[ProAirDataUpdateCoordinator], SensorEntity):
     """Representation of a ProAir Humidity Sensor."""
@@ -39,73 +46,211 @@ class ProAirHumiditySensor(CoordinatorEntity[ProAirDataUpdateCoordinator], Senso
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = PERCENTAGE
 
-    def __init__(self, coordinator: ProAirDataUpdateCoordinator, zone_data: dict[str, Any]) -> None:
+    def __init__(self, coordinator: ProAirDataUpdateCoordinator, serial: str, zone_data: dict[str, Any]) -> None:
         super().__init__(coordinator)
+        self._serial = serial
         self._id = zone_data["ZoneId"]
         self._name = zone_data["Name"]
-        self._attr_unique_id = f"proair_{coordinator.api.serial}_{zone_data['ZoneId']}_humidity"
+        self._attr_unique_id = f"proair_{serial}_{zone_data['ZoneId']}_humidity"
         self._attr_name = f"{zone_data['Name']} Humidity"
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when this zone changed."""
+        if self.coordinator.zone_changed(self._serial, self._id):
+            super()._handle_coordinator_update()
+
     @property
-    def _zone_data(self) -> dict[str, Any]:
-        """Get updated zone data."""
-        for zone in self.coordinator.data.get("Zones", []):
-            if zone["ZoneId"] == self._id:
-                return zone
-        return {}
+    def available(self) -> bool:
+        """Available while there is fresh or still acceptable cached state of the zone."""
+        return super().available and self.coordinator.get_zone(self._serial, self._id) is not None
 
     @property
     def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        val = self._zone_data.get("Umd")
-        if val is not None:
-            return float(val) / 10
-        return None
+        zone = self.coordinator.get_zone(self._serial, self._id)
+        return zone.humidity if zone is not None else None
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return the state attributes."""
-        return {
-            "last_update": self.coordinator.data.get("last_update")
-        }
+        return self.coordinator.unit_attributes(self._serial)
 
 class ProAirSystemStatusSensor(CoordinatorEntity[ProAirDataUpdateCoordinator], SensorEntity):
     """Unified ProAir System Status Sensor."""
 
-    def __init__(self, coordinator: ProAirDataUpdateCoordinator) -> None:
+    def __init__(self, coordinator: ProAirDataUpdateCoordinator, serial: str) -> None:
         super().__init__(coordinator)
-        self._attr_unique_id = f"proair_{coordinator.api.serial}_system_status"
+        self._serial = serial
+        self._attr_unique_id = f"proair_{serial}_system_status"
         self._attr_translation_key = "proair_system_status"
         self._attr_icon = "mdi:hvac"
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the control unit values changed."""
+        if self.coordinator.unit_changed(self._serial):
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Available while there is fresh or still acceptable cached state."""
+        return super().available and self.coordinator.unit_available(self._serial)
+
     @property
     def native_value(self) -> str:
         """Return the system status."""
-        if self.coordinator.data.get("IsOFF"):
-            return "system_off"
-        if self.coordinator.data.get("IsCooling"):
-            return "cooling"
-        return "heating"
+        unit = self.coordinator.get_unit_state(self._serial)
+        return unit.mode if unit is not None else "heating"
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        """Return detailed system attributes."""
-        data = self.coordinator.data
-        attrs = {
-            "serial_number": data.get("Serial"),
-            "firmware_version": data.get("FWVer"),
-            "errors": data.get("Errors"),
-            "system_off": data.get("IsOFF"),
-            "is_cooling": data.get("IsCooling"),
-            "operating_mode": data.get("OperatingModeCooling"),
-            "last_update": data.get("last_update")
+        """Return detailed system attributes, parsed once per unit snapshot."""
+        unit = self.coordinator.get_unit_state(self._serial)
+        return {
+            **(unit.attributes if unit is not None else {}),
+            **self.coordinator.unit_attributes(self._serial),
         }
-        
-        # Add channel temperature if available
-        if data.get("TempCan") is not None:
-             try:
-                 attrs["channel_temperature"] = float(data["TempCan"]) / 10.0
-             except (ValueError, TypeError):
-                 attrs["channel_temperature"] = None
-                 
-        return attrs
+
+# translation key -> (device class, unit, state class, entity category, icon, value, attributes)
+UNIT_SENSORS = {
+    "channel_temperature": (
+        SensorDeviceClass.TEMPERATURE, UnitOfTemperature.CELSIUS,
+        SensorStateClass.MEASUREMENT, None, None,
+        lambda unit: unit.channel_temperature, None,
+    ),
+    "firmware": (
+        None, None, None, EntityCategory.DIAGNOSTIC, "mdi:chip",
+        lambda unit: unit.firmware, None,
+    ),
+    "errors": (
+        None, None, None, EntityCategory.DIAGNOSTIC, "mdi:alert-circle-outline",
+        lambda unit: len(unit.errors), lambda unit: {"errors": unit.errors},
+    ),
+}
+
+class ProAirUnitSensor(CoordinatorEntity[ProAirDataUpdateCoordinator], SensorEntity):
+    """A unit-level value of a control unit, read from its parsed snapshot."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator: ProAirDataUpdateCoordinator, serial: str, key: str) -> None:
+        super().__init__(coordinator)
+        self._serial = serial
+        (
+            device_class, unit, state_class, category, icon, self._value, self._attributes
+        ) = UNIT_SENSORS[key]
+        self._attr_unique_id = f"proair_{serial}_{key}"
+        self._attr_translation_key = key
+        self._attr_translation_placeholders = {"serial": serial}
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_entity_category = category
+        self._attr_icon = icon
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the control unit values changed."""
+        if self.coordinator.unit_changed(self._serial):
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Available while there is fresh or still acceptable cached state."""
+        return super().available and self.coordinator.unit_available(self._serial)
+
+    @property
+    def native_value(self) -> Any:
+        unit = self.coordinator.get_unit_state(self._serial)
+        return self._value(unit) if unit is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        unit = self.coordinator.get_unit_state(self._serial)
+        if unit is None or self._attributes is None:
+            return None
+        return self._attributes(unit)
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+def _latency_attributes(histogram: LatencyHistogram) -> dict[str, Any]:
+    return {
+        "count": histogram.count,
+        "mean_ms": _milliseconds(histogram.mean),
+        "p50_ms": _milliseconds(histogram.quantile(0.5)),
+        "p95_ms": _milliseconds(histogram.quantile(0.95)),
+        "max_ms": _milliseconds(histogram.max if histogram.count else None),
+    }
+
+def _requests_attributes(metrics: ProAirMetrics) -> dict[str, Any]:
+    return {
+        **{f"{name}_requests": stats.requests for name, stats in metrics.endpoints.items()},
+        **metrics.counters,
+    }
+
+def _latency_value(metrics: ProAirMetrics) -> float | None:
+    stats = metrics.endpoints.get("GetCUState")
+    return _milliseconds(stats.latency.quantile(0.95)) if stats is not None else None
+
+def _endpoint_latency_attributes(metrics: ProAirMetrics) -> dict[str, Any]:
+    return {
+        f"{name}_{key}": value
+        for name, stats in metrics.endpoints.items()
+        for key, value in _latency_attributes(stats.latency).items()
+        if key != "count"
+    }
+
+# translation key -> (unit, state class, value, attributes)
+DIAGNOSTIC_SENSORS = {
+    "api_requests": (
+        None, SensorStateClass.TOTAL_INCREASING,
+        lambda metrics: metrics.requests, _requests_attributes,
+    ),
+    "api_failures": (
+        None, SensorStateClass.TOTAL_INCREASING,
+        lambda metrics: metrics.failures, lambda metrics: metrics.failures_by_class(),
+    ),
+    "api_latency": (
+        UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+        _latency_value, _endpoint_latency_attributes,
+    ),
+    "refresh_duration": (
+        UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+        lambda metrics: _milliseconds(metrics.refresh.last),
+        lambda metrics: {**_latency_attributes(metrics.refresh), "failures": metrics.refresh_failures},
+    ),
+}
+
+class ProAirDiagnosticSensor(CoordinatorEntity[ProAirDataUpdateCoordinator], SensorEntity):
+    """Request counters and latencies of the ProAir cloud, updated after every poll."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:chart-box-outline"
+
+    def __init__(self, coordinator: ProAirDataUpdateCoordinator, key: str) -> None:
+        super().__init__(coordinator)
+        self._key = key
+        unit, state_class, self._value, self._attributes = DIAGNOSTIC_SENSORS[key]
+        self._attr_unique_id = f"proair_{coordinator.api.serial}_{key}"
+        self._attr_translation_key = key
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        if unit is not None:
+            self._attr_device_class = SensorDeviceClass.DURATION
+
+    @property
+    def available(self) -> bool:
+        """Diagnostics stay available when the cloud is not."""
+        return True
+
+    @property
+    def native_value(self) -> float | int | None:
+        return self._value(self.coordinator.api.metrics)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._attributes(self.coordinator.api.metrics)
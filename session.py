@@ -0,0 +1,48 @@
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util import ssl as ssl_util
+
+from .api import create_session
+from .const import DOMAIN
+
+DATA_SESSION = f"{DOMAIN}_session"
+# Removes the listener closing the shared session when Home Assistant stops
+DATA_SESSION_UNSUB = f"{DOMAIN}_session_unsub"
+
+@callback
+def async_get_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Return the session shared by every ProAir entry, creating it on first use.
+
+    It is separate from Home Assistant's shared session, so ProAir traffic has its own
+    connection limit and keep-alive, and is closed when Home Assistant stops.
+    """
+    session: aiohttp.ClientSession | None = hass.data.get(DATA_SESSION)
+    if session is not None and not session.closed:
+        return session
+
+    session = hass.data[DATA_SESSION] = create_session(ssl_util.get_default_context())
+
+    async def _async_close(event: Event) -> None:
+        hass.data.pop(DATA_SESSION_UNSUB, None)
+        await session.close()
+
+    # A session closed earlier may have left its listener behind
+    if (unsub := hass.data.pop(DATA_SESSION_UNSUB, None)) is not None:
+        unsub()
+    hass.data[DATA_SESSION_UNSUB] = hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return session
+
+async def async_close_session(hass: HomeAssistant) -> None:
+    """Close the shared session once no ProAir entry uses it anymore."""
+    if (unsub := hass.data.pop(DATA_SESSION_UNSUB, None)) is not None:
+        unsub()
+    session: aiohttp.ClientSession | None = hass.data.pop(DATA_SESSION, None)
+    if session is not None:
+        await session.close()
+
+async def async_close_unused_session(hass: HomeAssistant) -> None:
+    """Close the shared session if no loaded entry uses it, e.g. after a failed config flow."""
+    if not hass.data.get(DOMAIN):
+        await async_close_session(hass)
@@ -0,0 +1,22 @@
+"""Load the integration modules outside Home Assistant.
+
+The repository root is the integration package itself, so the fleet poller and the
+benchmarks, run from the root (e.g. ``python -m fleet``), import it by registering
+the root as an empty ``proair_tecnosystemi`` package: the modules are then loaded
+without executing the Home Assistant setup in ``__init__.py``, and only aiohttp and
+pycryptodome are needed.
+"""
+import sys
+import types
+from pathlib import Path
+
+PACKAGE = "proair_tecnosystemi"
+ROOT = Path(__file__).resolve().parent
+
+def register_package(name: str = PACKAGE) -> types.ModuleType:
+    """Make the integration modules importable as `name`, without running its setup."""
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [str(ROOT)]
+        sys.modules[name] = package
+    return sys.modules[name]
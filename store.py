@@ -0,0 +1,225 @@
+import hashlib
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .api import ProAirAPI
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    SESSION_SAVE_DELAY,
+    HISTORY_SAVE_DELAY,
+    HISTORY_ARCHIVE_PERIOD,
+    TOPOLOGY_SAVE_DELAY,
+    SCHEDULE_SAVE_DELAY,
+)
+from .history import ProAirHistory
+from .schedule import ProAirScheduleEngine
+
+if TYPE_CHECKING:
+    from .coordinator import ProAirDataUpdateCoordinator
+
+def account_id(username: str, device_id: str) -> str:
+    """Stable, non-reversible identifier of a cloud account."""
+    return hashlib.sha256(f"{username}|{device_id}".encode()).hexdigest()[:16]
+
+class _ThrottledSave:
+    """Save a store at most once every `delay` seconds, however often it's asked to.
+
+    `Store.async_delay_save` restarts its delay on every call, so data changing more
+    often than the delay, like the history on every poll, would never be written.
+    The delayed save is armed only when none is due; it reads the data when it
+    writes, so it still includes every change made in the meantime.
+    """
+
+    def __init__(self, store: Store[dict[str, Any]], delay: float) -> None:
+        self._store = store
+        self._delay = delay
+        self._due = 0.0
+
+    @callback
+    def schedule(self, data_func: Callable[[], dict[str, Any]]) -> None:
+        now = time.monotonic()
+        if now < self._due:
+            return
+        self._due = now + self._delay
+        self._store.async_delay_save(data_func, self._delay)
+
+    async def save(self, data: dict[str, Any]) -> None:
+        """Save right away, replacing the delayed save."""
+        self._due = 0.0
+        await self._store.async_save(data)
+
+class ProAirSessionStore:
+    """Persist the token and discovered serials of an account in HA storage.
+
+    The store is keyed by account rather than by config entry, so the session
+    created while validating credentials in the config flow is reused by setup.
+    """
+
+    def __init__(self, hass: HomeAssistant, username: str, device_id: str) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.session_{account_id(username, device_id)}"
+        )
+        self._save = _ThrottledSave(self._store, SESSION_SAVE_DELAY)
+        self._api: ProAirAPI | None = None
+
+    async def async_restore(self, api: ProAirAPI) -> bool:
+        """Load a saved session into `api`, return whether login can be skipped."""
+        data = await self._store.async_load()
+        return bool(data) and api.restore_session(data)
+
+    def attach(self, api: ProAirAPI) -> None:
+        """Save the session of `api` whenever it changes."""
+        self._api = api
+        api.on_session_change = self.async_schedule_save
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save shortly, coalescing the token increments of a burst of requests."""
+        if self._api is not None:
+            self._save.schedule(self._api.export_session)
+
+    async def async_save(self, api: ProAirAPI) -> None:
+        """Save the session of `api` right away."""
+        await self._save.save(api.export_session())
+
+    async def async_remove(self) -> None:
+        """Delete the saved session."""
+        await self._store.async_remove()
+
+class ProAirHistoryStore:
+    """Persist the downsampled zone history of an account in HA storage.
+
+    A week of buckets is too much to rewrite on every save. Buckets of past archive
+    periods go to one store, rewritten once per period; the frequent saves only write
+    the buckets of the current period, to a second store.
+    """
+
+    def __init__(self, hass: HomeAssistant, username: str, device_id: str) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.history_{account_id(username, device_id)}"
+        )
+        self._recent_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.history_recent_{account_id(username, device_id)}"
+        )
+        self._save = _ThrottledSave(self._recent_store, HISTORY_SAVE_DELAY)
+        self._history: ProAirHistory | None = None
+        # Buckets starting before this wall clock time are in the archive store
+        self._archived_until: int | None = None
+
+    async def async_restore(self, history: ProAirHistory) -> bool:
+        """Load the saved buckets into `history`."""
+        data = await self._store.async_load()
+        if not data or not history.restore(data):
+            return False
+        self._archived_until = data.get("until")
+        if self._archived_until is not None and (recent := await self._recent_store.async_load()):
+            history.restore(recent, self._archived_until)
+        return True
+
+    def attach(self, history: ProAirHistory) -> None:
+        """Save `history` some time after new samples are recorded."""
+        self._history = history
+        history.on_change = self.async_schedule_save
+
+    def _archive_due(self) -> int | None:
+        """Start of the current archive period if the archive doesn't reach it yet."""
+        until = int(time.time() // HISTORY_ARCHIVE_PERIOD * HISTORY_ARCHIVE_PERIOD)
+        return until if until != self._archived_until else None
+
+    @staticmethod
+    def _archive_data(history: ProAirHistory, until: int) -> dict[str, Any]:
+        return {**history.export(until=until), "until": until}
+
+    def _recent_data(self, history: ProAirHistory) -> dict[str, Any]:
+        return history.export(since=self._archived_until or 0)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        if (history := self._history) is None:
+            return
+        if (until := self._archive_due()) is not None:
+            self._archived_until = until
+            self._store.async_delay_save(lambda: self._archive_data(history, until), HISTORY_SAVE_DELAY)
+        self._save.schedule(lambda: self._recent_data(history))
+
+    async def async_save(self) -> None:
+        """Save right away, e.g. on unload, replacing any pending delayed save."""
+        if (history := self._history) is None:
+            return
+        if (until := self._archive_due()) is not None:
+            self._archived_until = until
+            await self._store.async_save(self._archive_data(history, until))
+        await self._save.save(self._recent_data(history))
+
+    async def async_remove(self) -> None:
+        """Delete the saved history."""
+        await self._store.async_remove()
+        await self._recent_store.async_remove()
+
+class ProAirTopologyStore:
+    """Persist the zone layout of an account, so entities can be created before the first poll."""
+
+    def __init__(self, hass: HomeAssistant, username: str, device_id: str) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.topology_{account_id(username, device_id)}"
+        )
+        self._coordinator: "ProAirDataUpdateCoordinator | None" = None
+
+    async def async_load(self) -> dict[str, list[dict[str, Any]]]:
+        """Return the saved layout, keyed by control unit serial."""
+        data = await self._store.async_load()
+        return data.get("units", {}) if data else {}
+
+    def attach(self, coordinator: "ProAirDataUpdateCoordinator") -> None:
+        """Save the layout whenever a poll finds a new one."""
+        self._coordinator = coordinator
+        coordinator.on_topology_change = self.async_schedule_save
+
+    @callback
+    def async_schedule_save(self) -> None:
+        if self._coordinator is not None:
+            self._store.async_delay_save(self._data, TOPOLOGY_SAVE_DELAY)
+
+    def _data(self) -> dict[str, Any]:
+        return {"units": self._coordinator.topology if self._coordinator is not None else {}}
+
+    async def async_remove(self) -> None:
+        """Delete the saved layout."""
+        await self._store.async_remove()
+
+class ProAirScheduleStore:
+    """Persist the weekly zone schedules of an account."""
+
+    def __init__(self, hass: HomeAssistant, username: str, device_id: str) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.schedule_{account_id(username, device_id)}"
+        )
+        self._engine: ProAirScheduleEngine | None = None
+
+    async def async_restore(self, engine: ProAirScheduleEngine) -> None:
+        """Load the saved schedules into `engine`."""
+        data = await self._store.async_load()
+        if data:
+            engine.load(data.get("zones", {}))
+
+    def attach(self, engine: ProAirScheduleEngine) -> None:
+        """Save the schedules whenever they change."""
+        self._engine = engine
+        engine.on_change = self.async_schedule_save
+
+    @callback
+    def async_schedule_save(self) -> None:
+        if self._engine is not None:
+            self._store.async_delay_save(self._data, SCHEDULE_SAVE_DELAY)
+
+    def _data(self) -> dict[str, Any]:
+        return {"zones": self._engine.export() if self._engine is not None else {}}
+
+    async def async_remove(self) -> None:
+        """Delete the saved schedules."""
+        await self._store.async_remove()
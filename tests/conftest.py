@@ -0,0 +1,82 @@
+"""Fixtures of the ProAir tests, run from the repository root with ``python -m pytest``.
+
+Home Assistant finds custom integrations in the ``custom_components`` package, so the
+repository root, which is the integration itself, is exposed there through a link.
+Integration tests talk to the local cloud simulator of the benchmarks.
+"""
+import functools
+import shutil
+import sys
+import tempfile
+import types
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from pathlib import Path
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.simulator import ProAirSimulator
+from standalone import PACKAGE, ROOT
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+DEVICE_ID = "0f8fad5b-d9cb-469f-a165-70867728950e"
+USERNAME = "user@example.com"
+PASSWORD = "secret"
+
+_CUSTOM_COMPONENTS = Path(tempfile.mkdtemp(prefix="proair-tests-"))
+
+def pytest_configure(config: pytest.Config) -> None:
+    (_CUSTOM_COMPONENTS / PACKAGE).symlink_to(ROOT, target_is_directory=True)
+    package = types.ModuleType("custom_components")
+    package.__path__ = [str(_CUSTOM_COMPONENTS)]
+    sys.modules["custom_components"] = package
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    shutil.rmtree(_CUSTOM_COMPONENTS, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Let Home Assistant load the integration in every test."""
+
+@pytest.fixture
+async def simulator(socket_enabled: None) -> AsyncGenerator[ProAirSimulator, None]:
+    """A running cloud simulator on 127.0.0.1, with two control units of three zones."""
+    async with ProAirSimulator(DEVICE_ID, units=2, zones=3) as sim:
+        yield sim
+
+@pytest.fixture
+def api_factory(simulator: ProAirSimulator) -> Callable[..., object]:
+    """ProAirAPI bound to the simulator."""
+    from custom_components.proair_tecnosystemi.api import ProAirAPI
+
+    return functools.partial(ProAirAPI, base_url=simulator.base_url, login_url=simulator.login_url)
+
+@pytest.fixture
+def config_entry(hass: HomeAssistant) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=PACKAGE,
+        data={"username": USERNAME, "password": PASSWORD, "device_id": DEVICE_ID},
+        title=USERNAME,
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+@pytest.fixture
+def setup_integration(
+    hass: HomeAssistant, config_entry: MockConfigEntry, api_factory: Callable[..., object], monkeypatch: pytest.MonkeyPatch
+) -> Callable[[], Awaitable[object]]:
+    """Set up the config entry against the simulator and return its coordinator."""
+    from custom_components.proair_tecnosystemi import account, config_flow
+
+    monkeypatch.setattr(account, "ProAirAPI", api_factory)
+    monkeypatch.setattr(config_flow, "ProAirAPI", api_factory)
+
+    async def _setup() -> object:
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        return hass.data[PACKAGE][config_entry.entry_id]
+
+    return _setup
@@ -0,0 +1,80 @@
+"""Tests of the cloud client against the simulator."""
+import asyncio
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from custom_components.proair_tecnosystemi.api import ProAirCircuitOpenError, ProAirResponseError, ProAirServerError
+from custom_components.proair_tecnosystemi.const import CIRCUIT_FAILURE_THRESHOLD, SERIALS_REFRESH_INTERVAL
+
+from conftest import DEVICE_ID, PASSWORD, USERNAME
+
+async def test_relogin_on_unauthorized(hass: HomeAssistant, simulator, api_factory) -> None:
+    """A 401 without a JSON body logs in again and retries the request once."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    assert await api.login()
+    serial = api.serials[0]
+
+    simulator.expire_sessions()
+    data = await api.get_state(serial)
+
+    assert data["Serial"] == serial
+    assert simulator.requests["login"] == 2
+    assert api.metrics.counters["relogins"] == 1
+
+@pytest.mark.parametrize(("status", "body"), [(200, {"Message": "Control unit offline"}), (404, {})])
+async def test_error_body_is_not_a_state(hass: HomeAssistant, simulator, api_factory, status, body) -> None:
+    """Answers without a zone list are errors, not unit states."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    serial = api.serials[0]
+    simulator.state_errors[serial] = (status, body)
+
+    with pytest.raises(ProAirResponseError):
+        await api.get_state(serial)
+
+async def test_saved_serials_expire(hass: HomeAssistant, simulator, api_factory) -> None:
+    """A saved session is resumed until its serials are due for discovery again."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    session = api.export_session()
+
+    resumed = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    assert resumed.restore_session(session)
+    assert resumed.serials == api.serials
+
+    for discovered_at in (None, session["discovered_at"] - SERIALS_REFRESH_INTERVAL):
+        stale = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+        assert not stale.restore_session({**session, "discovered_at": discovered_at})
+
+async def test_concurrent_logins_share_one_request(hass: HomeAssistant, simulator, api_factory) -> None:
+    """Callers logging in while a login is in flight wait for it instead of sending their own."""
+    simulator.login_latency = 0.05
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+
+    assert await asyncio.gather(*(api.login() for _ in range(5))) == [True] * 5
+    assert simulator.requests["login"] == 1
+
+async def test_circuit_breaker(hass: HomeAssistant, simulator, api_factory) -> None:
+    """Repeated failures suspend requests without contacting the cloud; a success closes the circuit."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    serial = api.serials[0]
+    simulator.state_errors[serial] = (500, {})
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(ProAirServerError):
+            await api.get_state(serial)
+    requests = simulator.requests["state"]
+    with pytest.raises(ProAirCircuitOpenError):
+        await api.get_state(serial)
+    assert simulator.requests["state"] == requests
+    assert api.metrics.counters["circuit_rejections"] == 1
+
+    # Once the suspension is over, the next exchange goes through
+    del simulator.state_errors[serial]
+    api._circuit_open_until = 0.0
+    assert (await api.get_state(serial))["Serial"] == serial
+    assert api.consecutive_failures == 0
@@ -0,0 +1,66 @@
+"""Tests of the command queue against the simulator."""
+import asyncio
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from custom_components.proair_tecnosystemi.api import ZoneUpdate
+from custom_components.proair_tecnosystemi.commands import ProAirCommandQueue
+
+from conftest import DEVICE_ID, PASSWORD, USERNAME
+
+async def test_burst_is_coalesced(hass: HomeAssistant, simulator, api_factory) -> None:
+    """Only the last command of each zone in the window is sent, in one batch per unit."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    serial = api.serials[0]
+    flushes = 0
+
+    async def on_flush() -> None:
+        nonlocal flushes
+        flushes += 1
+
+    queue = ProAirCommandQueue(api, on_flush, debounce=0.05, max_delay=0.5)
+    accepted = await asyncio.gather(
+        *(queue.async_set_zone(serial, 0, "Zone 0", 20 + step / 2) for step in range(6)),
+        queue.async_set_zone(serial, 1, "Zone 1", 21, is_off=True),
+    )
+
+    assert all(accepted)
+    assert sorted(simulator.commands) == [(serial, 0, 225, False), (serial, 1, 210, True)]
+    assert simulator.units[serial]["Zones"][0]["SetTemp"] == 225
+    assert flushes == 1
+
+async def test_batches_of_a_unit_keep_their_order(hass: HomeAssistant, simulator, api_factory) -> None:
+    """A command queued while the previous batch is in flight is sent after it."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    serial = api.serials[0]
+    queue = ProAirCommandQueue(api, debounce=0.01, max_delay=0.1)
+
+    simulator.command_latency = 0.3
+    first = hass.async_create_task(queue.async_set_zone(serial, 0, "Zone 0", 21))
+    while not simulator.requests["command"]:
+        await asyncio.sleep(0.01)
+    # The newer command would be answered first if it were sent right away
+    simulator.command_latency = 0.0
+    await asyncio.gather(first, queue.async_set_zone(serial, 0, "Zone 0", 22))
+
+    assert simulator.commands == [(serial, 0, 210, False), (serial, 0, 220, False)]
+    assert simulator.units[serial]["Zones"][0]["SetTemp"] == 220
+
+async def test_immediate_batch_waits_for_queued_commands(hass: HomeAssistant, simulator, api_factory) -> None:
+    """Updates sent right away go after the older commands queued or in flight for their unit."""
+    api = api_factory(async_create_clientsession(hass), USERNAME, PASSWORD, DEVICE_ID)
+    await api.login()
+    serial = api.serials[0]
+    queue = ProAirCommandQueue(api, debounce=10, max_delay=10)
+
+    queued = hass.async_create_task(queue.async_set_zone(serial, 0, "Zone 0", 21))
+    await asyncio.sleep(0)
+    results = await queue.async_send_now([ZoneUpdate(0, "Zone 0", 22, False, serial)])
+
+    assert results == [True]
+    assert await queued
+    assert simulator.commands == [(serial, 0, 210, False), (serial, 0, 220, False)]
+    assert simulator.units[serial]["Zones"][0]["SetTemp"] == 220
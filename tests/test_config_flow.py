@@ -0,0 +1,94 @@
+"""Tests of the reauthentication of shared accounts."""
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.config_entries import SOURCE_REAUTH, SOURCE_USER, ConfigEntryState
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from conftest import DEVICE_ID, PACKAGE, PASSWORD, USERNAME
+
+async def test_rejected_password_starts_reauth_of_every_entry(
+    hass: HomeAssistant, simulator, setup_integration, config_entry
+) -> None:
+    # A duplicate entry from before entries were unique per account shares the poller
+    duplicate = MockConfigEntry(
+        domain=PACKAGE, data={"username": USERNAME, "password": PASSWORD, "device_id": DEVICE_ID}
+    )
+    duplicate.add_to_hass(hass)
+    coordinator = await setup_integration()
+    assert hass.data[PACKAGE][duplicate.entry_id] is coordinator
+
+    simulator.password = "changed"
+    simulator.expire_sessions()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    flows = [
+        flow for flow in hass.config_entries.flow.async_progress_by_handler(PACKAGE)
+        if flow["context"]["source"] == SOURCE_REAUTH
+    ]
+    assert {flow["context"]["entry_id"] for flow in flows} == {config_entry.entry_id, duplicate.entry_id}
+
+    flow = next(flow for flow in flows if flow["context"]["entry_id"] == config_entry.entry_id)
+    result = await hass.config_entries.flow.async_configure(flow["flow_id"], {"password": "wrong"})
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_auth"}
+
+    result = await hass.config_entries.flow.async_configure(flow["flow_id"], {"password": "changed"})
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+    await hass.async_block_till_done()
+    assert config_entry.data["password"] == "changed"
+    assert hass.data[PACKAGE][config_entry.entry_id].api.password == "changed"
+
+async def test_options_of_a_shared_account_apply_on_reload(
+    hass: HomeAssistant, simulator, setup_integration, config_entry
+) -> None:
+    coordinator = await setup_integration()
+
+    hass.config_entries.async_update_entry(
+        config_entry, options={"max_concurrency": 2, "request_budget": 120, "stale_window": 60}
+    )
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[PACKAGE][config_entry.entry_id]
+    assert coordinator.max_concurrency == 2
+    assert coordinator.scheduler.budget == 120
+    assert coordinator.stale_window == 60
+
+async def test_failed_first_refresh_retries_setup(
+    hass: HomeAssistant, simulator, setup_integration, config_entry
+) -> None:
+    """Units that can't be fetched at setup leave the entry retrying, without a poller behind."""
+    for serial in simulator.units:
+        simulator.state_errors[serial] = (500, {})
+
+    with pytest.raises(AssertionError):
+        await setup_integration()
+
+    assert config_entry.state is ConfigEntryState.SETUP_RETRY
+    assert not hass.data[f"{PACKAGE}_accounts"].accounts
+
+async def test_failed_flow_closes_session(
+    hass: HomeAssistant, simulator, api_factory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A flow that doesn't create an entry leaves neither the session nor its close listener behind."""
+    from custom_components.proair_tecnosystemi import config_flow
+    from custom_components.proair_tecnosystemi.session import DATA_SESSION
+
+    monkeypatch.setattr(config_flow, "ProAirAPI", api_factory)
+    simulator.password = "changed"
+    listeners = hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_CLOSE, 0)
+
+    result = await hass.config_entries.flow.async_init(PACKAGE, context={"source": SOURCE_USER})
+    for _ in range(2):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"username": USERNAME, "password": PASSWORD, "device_id": DEVICE_ID}
+        )
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"]
+
+    assert DATA_SESSION not in hass.data
+    assert hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_CLOSE, 0) == listeners
@@ -0,0 +1,126 @@
+"""Tests of the integration polling the simulator."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from benchmarks.simulator import unit_state
+from custom_components.proair_tecnosystemi.const import SERIALS_REFRESH_INTERVAL
+from custom_components.proair_tecnosystemi.store import account_id
+
+from conftest import DEVICE_ID, PACKAGE, USERNAME
+
+def _zone_entity(hass: HomeAssistant, name: str) -> str:
+    return next(
+        state.entity_id for state in hass.states.async_all("climate") if state.attributes["friendly_name"] == name
+    )
+
+async def _wait_for(condition, timeout: float = 3.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.02)
+
+@pytest.fixture
+async def coordinator(setup_integration):
+    coordinator = await setup_integration()
+    # Confirm commands within a fraction of a second instead of minutes
+    coordinator.acks._initial_delay = 0.05
+    coordinator.acks._max_delay = 0.1
+    coordinator.acks._timeout = 0.5
+    return coordinator
+
+async def test_command_confirmed_with_string_values(hass: HomeAssistant, simulator, coordinator) -> None:
+    """A unit reporting its values as strings confirms the command and keeps the new setpoint."""
+    simulator.numbers_as_strings = True
+    entity_id = _zone_entity(hass, "Zone 1")
+
+    await hass.services.async_call("climate", "set_temperature", {"entity_id": entity_id, "temperature": 23.5}, blocking=True)
+    assert hass.states.get(entity_id).attributes["command_status"] == "pending"
+
+    await _wait_for(lambda: hass.states.get(entity_id).attributes["command_status"] == "confirmed")
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert hass.states.get(entity_id).attributes["temperature"] == 23.5
+    assert not coordinator._patches
+
+async def test_unapplied_command_is_rolled_back(hass: HomeAssistant, simulator, coordinator) -> None:
+    """The requested setpoint shows until the unit gives up, then the reported one comes back."""
+    simulator.apply_commands = False
+    entity_id = _zone_entity(hass, "Zone 2")
+
+    await hass.services.async_call("climate", "set_temperature", {"entity_id": entity_id, "temperature": 25}, blocking=True)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    # Polled before the unit had a chance to apply it: still the requested value
+    assert hass.states.get(entity_id).attributes["temperature"] == 25
+
+    await _wait_for(lambda: hass.states.get(entity_id).attributes["command_status"] == "timeout")
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).attributes["temperature"] == 21
+    assert not coordinator._patches
+
+async def test_error_response_keeps_topology(hass: HomeAssistant, simulator, coordinator, hass_storage) -> None:
+    """A unit answering without zones is a failed fetch and doesn't erase its saved zone layout."""
+    key = f"{PACKAGE}.topology_{account_id(USERNAME, DEVICE_ID)}"
+    serial = next(iter(simulator.units))
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=10))
+    await hass.async_block_till_done()
+    layout = hass_storage[key]["data"]["units"][serial]
+    assert len(layout) == 3
+
+    for status, body in ((200, {"Message": "Control unit offline"}), (500, {})):
+        simulator.state_errors[serial] = (status, body)
+        await coordinator.async_refresh()
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=10))
+        await hass.async_block_till_done()
+
+        assert coordinator.topology[serial] == layout
+        assert hass_storage[key]["data"]["units"][serial] == layout
+
+async def test_sensor_drift_is_not_activity(hass: HomeAssistant, simulator, coordinator) -> None:
+    """Measured temperatures changing on every poll don't keep fast polling on; a new setpoint does."""
+    simulator.drift_rate = 1.0
+    for _ in range(3):
+        await coordinator.async_refresh()
+    assert coordinator.update_interval == timedelta(seconds=60)
+
+    serial = next(iter(simulator.units))
+    simulator.units[serial]["Zones"][0]["SetTemp"] += 1
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == timedelta(seconds=15)
+
+async def test_new_unit_is_discovered(hass: HomeAssistant, simulator, coordinator) -> None:
+    """A control unit added to the account is polled once the serials are due for discovery."""
+    simulator.units["SIM0002"] = unit_state("SIM0002", 3)
+    await coordinator.async_refresh()
+    assert "SIM0002" not in coordinator.units
+
+    coordinator.api.discovered_at -= SERIALS_REFRESH_INTERVAL
+    await coordinator.async_refresh()
+    assert "SIM0002" in coordinator.units
+    assert not coordinator.api.serials_expired
+
+async def test_failing_unit_is_served_from_cache_within_stale_window(
+    hass: HomeAssistant, simulator, coordinator
+) -> None:
+    """A unit that can't be fetched keeps its last state, marked stale, then becomes unavailable."""
+    entity_id = _zone_entity(hass, "Zone 1")
+    serial = next(iter(simulator.units))
+    simulator.state_errors[serial] = (500, {})
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.state != "unavailable"
+    assert state.attributes["stale"] is True
+
+    coordinator._fetched[serial] -= coordinator.stale_window + 1
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "unavailable"
+    assert not coordinator.unit_available(serial)
@@ -0,0 +1,62 @@
+"""Tests of the downsampled zone history."""
+from custom_components.proair_tecnosystemi.history import ProAirHistory
+from custom_components.proair_tecnosystemi.models import ZoneState
+
+SERIAL = "SIM0000"
+
+def _zones(temp: int, humidity: int | None = None, is_off: bool = False) -> dict[tuple[str, int], ZoneState]:
+    zone = {"ZoneId": 0, "Temp": temp, "SetTemp": 210, "Umd": humidity, "IsOFF": is_off}
+    return {(SERIAL, 0): ZoneState(SERIAL, zone)}
+
+def test_query_merges_buckets_by_samples() -> None:
+    """Wider buckets weight the means by samples and keep the extremes of every merged bucket."""
+    history = ProAirHistory(bucket=300, size=10)
+    history.record(3000, _zones(200, humidity=500))
+    history.record(3010, _zones(220))
+    history.record(3300, _zones(240, is_off=True))
+
+    rows = history.query(SERIAL, 0, 0)
+    assert [(row["temperature"], row["samples"]) for row in rows] == [(21.0, 2), (24.0, 1)]
+    # Humidity sampled once: the mean ignores the samples without it
+    assert rows[0]["humidity"] == 50.0
+
+    [row] = history.query(SERIAL, 0, 0, resolution=600)
+    assert row["start"] == "1970-01-01T00:50:00+00:00"
+    assert row["end"] == "1970-01-01T01:00:00+00:00"
+    assert row["temperature"] == 22.0
+    assert (row["temperature_min"], row["temperature_max"]) == (20.0, 24.0)
+    assert row["humidity"] == 50.0
+    assert row["on_ratio"] == 0.67
+    assert row["samples"] == 3
+
+def test_query_since_and_unknown_zone() -> None:
+    history = ProAirHistory(bucket=300, size=10)
+    for start in (0, 300, 600):
+        history.record(start, _zones(200))
+
+    assert [row["start"] for row in history.query(SERIAL, 0, 300)] == [
+        "1970-01-01T00:05:00+00:00",
+        "1970-01-01T00:10:00+00:00",
+    ]
+    assert history.query(SERIAL, 1, 0) == []
+
+def test_export_ranges_restore_without_duplicates() -> None:
+    """An archive and the buckets saved after it restore into the same history."""
+    history = ProAirHistory(bucket=300, size=10)
+    for start in (0, 300, 600, 900):
+        history.record(start, _zones(200 + start // 30))
+    archive = history.export(until=600)
+    recent = history.export(since=600)
+
+    restored = ProAirHistory(bucket=300, size=10)
+    assert restored.restore(archive)
+    # An older save of the recent buckets may still hold archived ones
+    assert restored.restore(history.export(), since=600)
+    closed = history.query(SERIAL, 0, 0)[:-1]
+    assert restored.query(SERIAL, 0, 0) == closed
+
+    restored = ProAirHistory(bucket=300, size=10)
+    restored.restore(archive)
+    restored.restore(recent, since=600)
+    assert restored.query(SERIAL, 0, 0) == closed
+    assert not ProAirHistory(bucket=600).restore(archive)
@@ -0,0 +1,42 @@
+"""Tests of the weekly zone schedules."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.proair_tecnosystemi.schedule import WeeklySchedule
+
+TZ = timezone(timedelta(hours=2))
+WORKDAYS = ["mon", "tue", "wed", "thu", "fri"]
+# A Monday
+MONDAY = datetime(2026, 10, 12, tzinfo=TZ)
+
+def _at(days: int, hour: int, minute: int = 0) -> datetime:
+    return MONDAY + timedelta(days=days, hours=hour, minutes=minute)
+
+def test_next_change_within_the_day() -> None:
+    schedule = WeeklySchedule([
+        {"days": WORKDAYS, "at": "06:30", "temperature": 21.5},
+        {"days": WORKDAYS, "at": "22:00"},
+    ])
+
+    assert schedule.next_change(_at(0, 5)) == (_at(0, 6, 30), 21.5)
+    assert schedule.next_change(_at(0, 12)) == (_at(0, 22), None)
+    # Strictly after: a transition at the given time is already applied
+    assert schedule.next_change(_at(0, 6, 30)) == (_at(0, 22), None)
+    assert schedule.next_change(_at(0, 12))[0].tzinfo is TZ
+
+def test_next_change_wraps_days_and_week() -> None:
+    schedule = WeeklySchedule([
+        {"days": WORKDAYS, "at": "06:30", "temperature": 21.5},
+        {"days": WORKDAYS, "at": "22:00"},
+    ])
+
+    # After the last slot of the day: the first one of the next day
+    assert schedule.next_change(_at(1, 23)) == (_at(2, 6, 30), 21.5)
+    # Friday night: over the weekend to next Monday
+    assert schedule.next_change(_at(4, 23)) == (_at(7, 6, 30), 21.5)
+
+def test_single_weekly_slot_comes_back_after_a_week() -> None:
+    schedule = WeeklySchedule([{"days": ["wed"], "at": "07:00", "temperature": 20}])
+
+    assert schedule.next_change(_at(2, 8)) == (_at(9, 7), 20)
+    assert not WeeklySchedule([])
+    assert WeeklySchedule([]).next_change(_at(0, 0)) is None
@@ -0,0 +1,44 @@
+"""Tests of the poll scheduler."""
+from custom_components.proair_tecnosystemi.const import STABLE_POLLS_BEFORE_BACKOFF
+from custom_components.proair_tecnosystemi.scheduler import BUDGET_WINDOW, ProAirPollScheduler
+
+def _scheduler(budget: int = 0) -> ProAirPollScheduler:
+    return ProAirPollScheduler(budget, base_interval=60, fast_interval=15, max_interval=600, activity_window=300)
+
+def test_stable_polls_back_off() -> None:
+    """Polls finding nothing new keep the base interval for a while, then back off up to the maximum."""
+    scheduler = _scheduler()
+    now, intervals = 0.0, []
+    for _ in range(STABLE_POLLS_BEFORE_BACKOFF + 6):
+        intervals.append(scheduler.next_interval(now, 0, 1))
+        now += intervals[-1]
+
+    assert intervals[:STABLE_POLLS_BEFORE_BACKOFF] == [60] * STABLE_POLLS_BEFORE_BACKOFF
+    assert intervals[STABLE_POLLS_BEFORE_BACKOFF:] == [120, 240, 480, 600, 600, 600]
+
+def test_change_opens_fast_window() -> None:
+    """A change polls fast until the activity window closes, then the base interval comes back."""
+    scheduler = _scheduler()
+    for now in range(0, 600, 60):
+        scheduler.next_interval(now, 0, 1)
+
+    assert scheduler.next_interval(1000, 0, 1, changed=True) == 15
+    assert scheduler.next_interval(1200, 0, 1) == 15
+    assert scheduler.next_interval(1300, 0, 1) == 60
+
+def test_errors_back_off_and_honour_retry_after() -> None:
+    """Failed polls double the interval and never come back before the server asked to."""
+    scheduler = _scheduler()
+
+    assert [scheduler.next_interval(now, 0, 1, error=True) for now in range(4)] == [60, 120, 240, 480]
+    assert scheduler.next_interval(5, 0, 1, error=True, retry_after=900) == 900
+    assert scheduler.next_interval(6, 0, 1) == 60
+
+def test_budget_paces_and_waits_for_window() -> None:
+    """Polls are spread over the hour and wait for the window to slide once the budget is spent."""
+    scheduler = _scheduler(budget=120)
+    # 4 requests per poll out of 120 an hour: one poll every 2 minutes, even while active
+    assert scheduler.next_interval(0, 0, 4, changed=True) == BUDGET_WINDOW * 4 / 120
+
+    # Budget spent 10 minutes in: wait until the first sample leaves the window
+    assert scheduler.next_interval(600, 118, 4, changed=True) == BUDGET_WINDOW - 600
@@ -0,0 +1,17 @@
+"""Tests of the sensor platform."""
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+async def test_diagnostic_sensors_use_translated_names(hass: HomeAssistant, simulator, setup_integration) -> None:
+    await setup_integration()
+    registry = er.async_get(hass)
+
+    names = {
+        "sensor.proair_api_requests": "ProAir API Requests",
+        "sensor.proair_api_failures": "ProAir API Failures",
+        "sensor.proair_api_latency_p95": "ProAir API Latency p95",
+        "sensor.proair_refresh_duration": "ProAir Refresh Duration",
+    }
+    for entity_id, name in names.items():
+        assert hass.states.get(entity_id).attributes["friendly_name"] == name
+        assert registry.async_get(entity_id).translation_key is not None
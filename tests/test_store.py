@@ -0,0 +1,90 @@
+"""Tests of what the integration keeps across restarts."""
+import base64
+import time
+from array import array
+from datetime import timedelta
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.proair_tecnosystemi.const import (
+    HISTORY_ARCHIVE_PERIOD,
+    HISTORY_SAVE_DELAY,
+    SCHEDULE_SAVE_DELAY,
+)
+from custom_components.proair_tecnosystemi.store import account_id
+
+from conftest import DEVICE_ID, PACKAGE, USERNAME
+
+ACCOUNT = account_id(USERNAME, DEVICE_ID)
+
+async def test_history_saved_while_polling_and_restored(
+    hass: HomeAssistant, simulator, setup_integration, config_entry, hass_storage
+) -> None:
+    coordinator = await setup_integration()
+    serial = next(iter(simulator.units))
+    # Samples of polls an hour ago, in buckets that are closed by now
+    now = time.time()
+    coordinator.history.record(now - 3600, coordinator.zones)
+    coordinator.history.record(now - 1800, coordinator.zones)
+    for _ in range(3):
+        await coordinator.async_refresh()
+    expected = coordinator.history.query(serial, 0, now - 7200)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=HISTORY_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+    assert f"{PACKAGE}.history_{ACCOUNT}" in hass_storage
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    coordinator = await setup_integration()
+    restored = coordinator.history.query(serial, 0, now - 7200)
+    assert restored[:2] == expected[:2]
+    assert restored[0]["samples"] == 1
+
+async def test_history_saves_rewrite_current_period_only(
+    hass: HomeAssistant, simulator, setup_integration, hass_storage
+) -> None:
+    """Buckets of past periods go to the archive; the frequent saves only carry the current period."""
+    coordinator = await setup_integration()
+    serial = next(iter(simulator.units))
+    period = int(time.time() // HISTORY_ARCHIVE_PERIOD * HISTORY_ARCHIVE_PERIOD)
+    coordinator.history.record(period - 3600, coordinator.zones)
+    await coordinator.async_refresh()
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=HISTORY_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+
+    def starts(key: str) -> list[int]:
+        data = hass_storage[key]["data"]
+        return array("q", base64.b64decode(data["zones"][f"{serial}/0"]["starts"])).tolist()
+
+    assert hass_storage[f"{PACKAGE}.history_{ACCOUNT}"]["data"]["until"] == period
+    assert starts(f"{PACKAGE}.history_{ACCOUNT}") == [period - 3600]
+    assert all(start >= period for start in starts(f"{PACKAGE}.history_recent_{ACCOUNT}"))
+
+async def test_schedule_saved_and_restored(
+    hass: HomeAssistant, simulator, setup_integration, config_entry, hass_storage
+) -> None:
+    coordinator = await setup_integration()
+    serial = next(iter(simulator.units))
+    entity_id = next(
+        state.entity_id for state in hass.states.async_all("climate") if state.attributes["friendly_name"] == "Zone 0"
+    )
+    slots = [
+        {"days": ["mon", "tue", "wed", "thu", "fri"], "at": "06:30", "temperature": 21.5},
+        {"days": ["mon", "tue", "wed", "thu", "fri"], "at": "22:00", "hvac_mode": "off"},
+    ]
+    await hass.services.async_call(PACKAGE, "set_schedule", {"entity_id": entity_id, "slots": slots}, blocking=True)
+    assert coordinator.schedule.next_change(serial, 0) is not None
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=SCHEDULE_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+    saved = hass_storage[f"{PACKAGE}.schedule_{ACCOUNT}"]["data"]["zones"][f"{serial}:0"]
+    assert {(slot["at"], slot["temperature"]) for slot in saved} == {("06:30", 21.5), ("22:00", None)}
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    coordinator = await setup_integration()
+    assert coordinator.schedule.export()[f"{serial}:0"] == saved
+    assert hass.states.get(entity_id).attributes["next_schedule_change"] is not None